@@ -20,6 +20,7 @@ class App extends Component {
     this.state = {
       banners: [],  // null represent "Loading" state, will be replaced by Array on server response
       products: null,  // null represent "Loading" state, will be replaced by Array on server response
+      categories: [],
       term: '',
       cart: [],
       quickViewProduct: null,  // will be replaced by selected product attributes
@@ -101,8 +102,8 @@ class App extends Component {
   }
 
 
-  async getProducts(){
-    let response = await fetch('/api/products/', {
+  async getBootstrap(){
+    let response = await fetch('/api/bootstrap/', {
       headers: {
         'Accept': 'application/json',
         'Content-Type': 'application/json',
@@ -115,31 +116,14 @@ class App extends Component {
 
     let data = await response.json();
     this.setState({
-      products : data
-    });
-  }
-
-  async getBanners(){
-    let response = await fetch('/api/banners/', {
-      headers: {
-        'Accept': 'application/json',
-        'Content-Type': 'application/json',
-      }
-    });
-
-    if (!response.ok){
-      return;
-    }
-
-    let data = await response.json();
-    this.setState({
-      banners : data
+      banners : data.banners,
+      categories : data.categories,
+      products : data.products
     });
   }
 
   componentDidMount(){
-    this.getProducts();
-    this.getBanners();
+    this.getBootstrap();
   }
 
 
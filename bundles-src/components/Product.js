@@ -39,13 +39,20 @@ class Product extends Component{
 
   render(){
     let image = this.props.product.image;
+    let srcset = this.props.product.image_srcset || {};
+    let sourceTypes = Object.keys(srcset).sort((a, b) => (b === 'image/webp') - (a === 'image/webp'));
     let name = this.props.product.name;
     let price = this.props.product.price;
     let id = this.props.product.id;
     return (
       <div className="product">
         <div className="product-image">
-          <img src={image} alt={name} onClick={this.quickView.bind(this)}/>
+          <picture>
+            {sourceTypes.map(type =>
+              <source key={type} type={type} srcSet={srcset[type]} sizes="(max-width: 768px) 50vw, 320px"/>
+            )}
+            <img src={image} alt={name} onClick={this.quickView.bind(this)}/>
+          </picture>
         </div>
         <h4 className="product-name">{name}</h4>
         <p className="product-price currency">{price}</p>
@@ -1,19 +1,73 @@
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
+from .cache import get_coordinates_cache
 from .models import Coordinates
+from .normalizers import normalize_address
+
+
+class GeocodingStatusFilter(admin.SimpleListFilter):
+    title = 'статус геокодирования'
+    parameter_name = 'geocoding'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('resolved', 'Найдены'),
+            ('backoff', 'Ожидают повтора'),
+            ('due', 'Готовы к повтору'),
+        ]
+
+    def queryset(self, request, queryset):
+        now = timezone.now()
+        if self.value() == 'resolved':
+            return queryset.filter(lat__isnull=False, lon__isnull=False)
+        if self.value() == 'backoff':
+            return queryset.filter(retry_after__gt=now)
+        if self.value() == 'due':
+            return queryset.filter(retry_after__lte=now)
+        return queryset
 
 
 @admin.register(Coordinates)
 class CoordinatesAdmin(admin.ModelAdmin):
-    list_display = ['address', 'lat', 'lon', 'created_at', 'last_checked']
-    list_filter = ['created_at', 'last_checked']
-    search_fields = ['address']
-    readonly_fields = ['created_at', 'updated_at']
+    list_display = [
+        'address', 'lat', 'lon', 'created_at', 'last_checked',
+        'failure_reason', 'failed_attempts', 'retry_after', 'in_backoff',
+    ]
+    list_filter = [GeocodingStatusFilter, 'failure_reason', 'created_at', 'last_checked']
+    search_fields = ['address', 'normalized_address']
+    readonly_fields = ['normalized_address', 'created_at', 'updated_at', 'geocoded_at']
     fieldsets = (
         ('Основное', {
-            'fields': ('address', 'lat', 'lon')
+            'fields': ('address', 'normalized_address', 'lat', 'lon')
+        }),
+        ('Ошибки геокодирования', {
+            'fields': ('failure_reason', 'failed_attempts', 'retry_after'),
         }),
         ('Временные метки', {
-            'fields': ('created_at', 'updated_at', 'last_checked'),
+            'fields': ('created_at', 'updated_at', 'geocoded_at', 'last_checked'),
             'classes': ('collapse',)
         }),
     )
+
+    def save_model(self, request, obj, form, change):
+        addresses = {obj.address}
+        if change and 'address' in form.initial:
+            addresses.add(form.initial['address'])
+        if obj.is_resolved:
+            obj.failure_reason = ''
+            obj.failed_attempts = 0
+            obj.retry_after = None
+        super().save_model(request, obj, form, change)
+        keys = {normalize_address(address) for address in addresses}
+        transaction.on_commit(lambda: get_coordinates_cache().invalidate(*keys))
+
+    def delete_model(self, request, obj):
+        key = obj.normalized_address
+        super().delete_model(request, obj)
+        transaction.on_commit(lambda: get_coordinates_cache().invalidate(key))
+
+    def delete_queryset(self, request, queryset):
+        keys = set(queryset.values_list('normalized_address', flat=True))
+        super().delete_queryset(request, queryset)
+        transaction.on_commit(lambda: get_coordinates_cache().invalidate(*keys))
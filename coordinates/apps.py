@@ -1,7 +1,12 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished
 
 
 class CoordinatesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'coordinates'
     verbose_name = 'Координаты'
+
+    def ready(self):
+        from .touches import flush_touches_if_due
+        request_finished.connect(flush_touches_if_due, dispatch_uid='coordinates_flush_touches')
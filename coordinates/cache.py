@@ -0,0 +1,162 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+
+MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CoordinatesCache:
+    key_prefix = 'coordinates'
+
+    def __init__(self):
+        self.local = LRUCache(
+            settings.COORDINATES_CACHE_SIZE,
+            settings.COORDINATES_CACHE_TTL,
+        )
+        self._counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+        self._counters_lock = threading.Lock()
+        self._generation = None
+        self._generation_checked_at = None
+
+    @property
+    def shared(self):
+        return caches[settings.COORDINATES_CACHE_ALIAS]
+
+    @property
+    def generation_key(self):
+        return f'{self.key_prefix}:generation'
+
+    def make_key(self, address):
+        digest = hashlib.md5(address.encode('utf-8')).hexdigest()
+        return f'{self.key_prefix}:{digest}'
+
+    def _count(self, counter, amount=1):
+        if amount:
+            with self._counters_lock:
+                self._counters[counter] += amount
+
+    def _sync_generation(self):
+        # Поколение сверяем раз в интервал, чтобы локальные попадания не ходили в общий кэш
+        now = time.monotonic()
+        checked_at = self._generation_checked_at
+        if checked_at is not None and now - checked_at < settings.COORDINATES_CACHE_SYNC_INTERVAL:
+            return
+        self._generation_checked_at = now
+        generation = self.shared.get(self.generation_key)
+        if generation != self._generation:
+            # Какой-то процесс вытеснил адреса: локальным копиям больше не верим
+            self.local.clear()
+            self._generation = generation
+
+    def get_many(self, addresses):
+        self._sync_generation()
+        found = {}
+        remote_keys = {}
+        for address in addresses:
+            value = self.local.get(address)
+            if value is MISSING:
+                remote_keys[self.make_key(address)] = address
+            else:
+                found[address] = value
+        self._count('local_hits', len(found))
+        if remote_keys:
+            shared_values = self.shared.get_many(list(remote_keys))
+            for key, value in shared_values.items():
+                address = remote_keys[key]
+                value = tuple(value)
+                found[address] = value
+                self.local.set(address, value)
+            self._count('shared_hits', len(shared_values))
+            self._count('misses', len(remote_keys) - len(shared_values))
+        return found
+
+    def get(self, address):
+        return self.get_many([address]).get(address)
+
+    def set_many(self, coordinates):
+        if not coordinates:
+            return
+        for address, value in coordinates.items():
+            self.local.set(address, value)
+        self.shared.set_many(
+            {self.make_key(address): value for address, value in coordinates.items()},
+            timeout=settings.COORDINATES_CACHE_TTL,
+        )
+
+    def set(self, address, value):
+        self.set_many({address: value})
+
+    def invalidate(self, *addresses):
+        for address in addresses:
+            self.local.delete(address)
+        self.shared.delete_many([self.make_key(address) for address in addresses])
+        self.shared.set(self.generation_key, time.time_ns(), timeout=settings.COORDINATES_CACHE_TTL)
+
+    def clear(self):
+        self.local.clear()
+        with self._counters_lock:
+            for counter in self._counters:
+                self._counters[counter] = 0
+
+    def stats(self):
+        with self._counters_lock:
+            stats = dict(self._counters)
+        stats['local_size'] = len(self.local)
+        requests_total = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        hits = stats['local_hits'] + stats['shared_hits']
+        stats['hit_rate'] = round(hits / requests_total, 3) if requests_total else None
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_coordinates_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CoordinatesCache()
+    return _cache
@@ -0,0 +1,60 @@
+import math
+
+from .utils import KM_PER_DEGREE
+
+# Ячейка кодируется как геохеш, но целым числом: биты широты и долготы чередуются,
+# поэтому все точки ячейки любого уровня лежат в непрерывном диапазоне кодов
+CELL_BITS = 26
+
+
+def _cell_index(lat, lon, bits):
+    size = 2 ** bits
+    row = min(int((lat + 90) / 180 * size), size - 1)
+    column = min(int((lon + 180) / 360 * size), size - 1)
+    return row, column
+
+
+def _interleave(row, column, bits):
+    code = 0
+    for bit in range(bits - 1, -1, -1):
+        code = (code << 2) | (((column >> bit) & 1) << 1) | ((row >> bit) & 1)
+    return code
+
+
+def encode(lat, lon):
+    if lat is None or lon is None:
+        return None
+    return _interleave(*_cell_index(lat, lon, CELL_BITS), CELL_BITS)
+
+
+def _precision_for_radius(lat, radius_km):
+    widest_lat = min(abs(lat) + radius_km / KM_PER_DEGREE, 89.9)
+    for bits in range(CELL_BITS, 0, -1):
+        height_km = 180 / 2 ** bits * KM_PER_DEGREE
+        width_km = 360 / 2 ** bits * KM_PER_DEGREE * math.cos(math.radians(widest_lat))
+        if min(height_km, width_km) >= radius_km:
+            return bits
+    return 0
+
+
+def covering_ranges(lat, lon, radius_km):
+    bits = _precision_for_radius(lat, radius_km)
+    if bits == 0:
+        return [(0, 2 ** (2 * CELL_BITS))]
+    size = 2 ** bits
+    row, column = _cell_index(lat, lon, bits)
+    shift = 2 * (CELL_BITS - bits)
+    codes = sorted({
+        _interleave(row + row_offset, (column + column_offset) % size, bits)
+        for row_offset in (-1, 0, 1)
+        for column_offset in (-1, 0, 1)
+        if 0 <= row + row_offset < size
+    })
+    ranges = []
+    for code in codes:
+        start, end = code << shift, (code + 1) << shift
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
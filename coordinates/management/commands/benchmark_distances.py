@@ -0,0 +1,45 @@
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from coordinates.utils import calculate_distance, distance_matrix
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает попарный и векторизованный расчёт расстояний'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=300)
+        parser.add_argument('--restaurants', type=int, default=40)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        def random_point():
+            return (rng.uniform(55.55, 55.95), rng.uniform(37.35, 37.85))
+
+        orders = [random_point() for _ in range(options['orders'])]
+        restaurants = [random_point() for _ in range(options['restaurants'])]
+        pairs = len(orders) * len(restaurants)
+
+        started_at = time.perf_counter()
+        per_pair = [[calculate_distance(order, restaurant) for restaurant in restaurants] for order in orders]
+        per_pair_time = time.perf_counter() - started_at
+
+        timings = {'по парам (geodesic)': per_pair_time}
+        for method in ('haversine', 'geodesic'):
+            started_at = time.perf_counter()
+            matrix = distance_matrix(orders, restaurants, method=method)
+            timings[f'матрица ({method})'] = time.perf_counter() - started_at
+            if method == 'haversine':
+                max_error = float(np.max(np.abs(matrix - np.array(per_pair))))
+
+        self.stdout.write(f'{len(orders)} заказов × {len(restaurants)} ресторанов = {pairs} пар')
+        for name, elapsed in timings.items():
+            self.stdout.write(
+                f'{name:<22} {elapsed * 1000:9.2f} мс  (x{per_pair_time / elapsed:.1f})'
+            )
+        self.stdout.write(f'Максимальное расхождение haversine и geodesic: {max_error:.3f} км')
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from coordinates.cache import get_coordinates_cache
+from coordinates.models import Coordinates
+from coordinates.normalizers import normalize_address
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает нормализованные адреса и объединяет дубликаты координат'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, какие записи будут объединены',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        coordinates = list(Coordinates.objects.order_by('id'))
+
+        stale = []
+        for coords_obj in coordinates:
+            normalized_address = normalize_address(coords_obj.address)
+            if coords_obj.normalized_address != normalized_address:
+                coords_obj.normalized_address = normalized_address
+                stale.append(coords_obj)
+
+        groups = defaultdict(list)
+        for coords_obj in coordinates:
+            groups[coords_obj.normalized_address].append(coords_obj)
+
+        duplicate_ids = []
+        merges = []
+        for key, group in groups.items():
+            if len(group) < 2:
+                continue
+            keeper = max(group, key=lambda obj: (obj.is_resolved, obj.last_checked, -obj.id))
+            duplicates = [obj for obj in group if obj.pk != keeper.pk]
+            duplicate_ids.extend(obj.pk for obj in duplicates)
+            merges.append((keeper, [obj.pk for obj in duplicates]))
+            self.stdout.write(
+                f'{key}: оставляем «{keeper.address}», удаляем '
+                + ', '.join(f'«{obj.address}»' for obj in duplicates)
+            )
+
+        if dry_run:
+            self.stdout.write(
+                f'Нужно пересчитать ключей: {len(stale)}, удалить дубликатов: {len(duplicate_ids)}'
+            )
+            return
+
+        # Заказы и рестораны ссылаются на координаты через SET_NULL, поэтому до удаления
+        # дубликатов переводим их на оставшуюся запись, иначе они потеряют координаты
+        relations = [
+            relation for relation in Coordinates._meta.related_objects
+            if relation.one_to_many
+        ]
+        relinked = 0
+        with transaction.atomic():
+            Coordinates.objects.bulk_update(stale, ['normalized_address'], batch_size=500)
+            for keeper, ids in merges:
+                for relation in relations:
+                    relinked += relation.related_model._base_manager.filter(
+                        **{f'{relation.field.name}__in': ids}
+                    ).update(**{relation.field.name: keeper})
+            Coordinates.objects.filter(pk__in=duplicate_ids).delete()
+        get_coordinates_cache().invalidate(*groups)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано ключей: {len(stale)}, удалено дубликатов: {len(duplicate_ids)}, '
+            f'перепривязано записей: {relinked}'
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from coordinates.models import Coordinates
+
+
+class Command(BaseCommand):
+    help = 'Повторно геокодирует устаревшие координаты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Адресов в одной пачке')
+        parser.add_argument('--limit', type=int, default=None, help='Максимум адресов за один проход')
+        parser.add_argument('--rate', type=float, default=None, help='Запросов к геокодеру в секунду')
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно')
+        parser.add_argument('--interval', type=int, default=60 * 60, help='Пауза между проходами, сек')
+
+    def handle(self, *args, **options):
+        while True:
+            stats = Coordinates.objects.refresh_stale(
+                batch_size=options['batch_size'],
+                limit=options['limit'],
+                rate_limit=options['rate'],
+            )
+            self.stdout.write(
+                f"Проверено: {stats['checked']}, обновлено: {stats['refreshed']}, "
+                f"ошибок: {stats['failed']}"
+            )
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -1,61 +1,236 @@
+from datetime import timedelta
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 import logging
-from .services import geocode_address
+from .cache import get_coordinates_cache
+from .geocells import covering_ranges, encode as encode_geocell
+from .normalizers import normalize_address
+from .signals import coordinates_changed
+from .touches import get_touch_buffer
+from .utils import distance_matrix
+from .services import (
+    fetch_coordinates, geocode_addresses, GeocodingError, INVALID_RESPONSE, TRANSIENT_REASONS,
+)
 
 logger = logging.getLogger(__name__)
 
+GEOCODING_FIELDS = [
+    'lat', 'lon', 'geocell', 'last_checked', 'geocoded_at', 'updated_at',
+    'failure_reason', 'failed_attempts', 'retry_after',
+]
+
+
+class CoordinatesQuerySet(models.QuerySet):
+    # bulk_create и bulk_update обходят save(), поэтому служебные поля заполняем здесь
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for coords_obj in objs:
+            coords_obj.normalized_address = normalize_address(coords_obj.address)
+            coords_obj.geocell = encode_geocell(coords_obj.lat, coords_obj.lon)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if 'address' in fields:
+            for coords_obj in objs:
+                coords_obj.normalized_address = normalize_address(coords_obj.address)
+            fields.append('normalized_address')
+        if {'lat', 'lon'} & set(fields):
+            for coords_obj in objs:
+                coords_obj.geocell = encode_geocell(coords_obj.lat, coords_obj.lon)
+            fields.append('geocell')
+        return super().bulk_update(objs, list(dict.fromkeys(fields)), *args, **kwargs)
+
+    def near(self, lat, lon, radius_km):
+        cells = models.Q()
+        for start, end in covering_ranges(lat, lon, radius_km):
+            cells |= models.Q(geocell__gte=start, geocell__lt=end)
+        return self.filter(cells)
+
+    def within(self, lat, lon, radius_km):
+        candidates = list(self.near(lat, lon, radius_km).filter(lat__isnull=False, lon__isnull=False))
+        if not candidates:
+            return []
+        distances = distance_matrix([(lat, lon)], [coords_obj.position for coords_obj in candidates])[0]
+        found = []
+        for coords_obj, distance in zip(candidates, distances):
+            coords_obj.distance = float(distance)
+            if coords_obj.distance <= radius_km:
+                found.append(coords_obj)
+        found.sort(key=lambda coords_obj: coords_obj.distance)
+        return found
+
+
+class CoordinatesManager(models.Manager.from_queryset(CoordinatesQuerySet)):
+    def _pick_by_key(self, coords_objects):
+        coords_by_key = {}
+        for obj in coords_objects:
+            current = coords_by_key.get(obj.normalized_address)
+            if current is None or (obj.is_resolved and not current.is_resolved):
+                coords_by_key[obj.normalized_address] = obj
+        return coords_by_key
+
+    def for_address(self, address):
+        key = normalize_address(address.strip()) if address else ''
+        if not key:
+            return None
+        return self._pick_by_key(self.filter(normalized_address=key)).get(key)
+
+    def for_addresses(self, addresses):
+        keys_by_address = {
+            address: normalize_address(address.strip())
+            for address in addresses if address and address.strip()
+        }
+        coords_by_key = self._pick_by_key(
+            self.filter(normalized_address__in=set(keys_by_address.values()))
+        )
+        return {
+            address: coords_by_key[key]
+            for address, key in keys_by_address.items() if key in coords_by_key
+        }
 
-class CoordinatesManager(models.Manager):
     def get_or_fetch_coordinates(self, address):
         if not address or not address.strip():
             return None
         address = address.strip()
-        try:
-            coords_obj = self.get(address=address)
-            return (coords_obj.lat, coords_obj.lon)
-        except self.model.DoesNotExist:
-            pass
-        coordinates = geocode_address(address)
-        if coordinates:
-            self.create(
-                address=address,
-                lat=coordinates[0],
-                lon=coordinates[1]
-            )
+        key = normalize_address(address)
+        if not key:
+            return None
+        cache = get_coordinates_cache()
+        cached = cache.get(key)
+        if cached:
+            get_touch_buffer().touch([key])
+            return cached
+        coords_obj = self._pick_by_key(self.filter(normalized_address=key)).get(key)
+        if coords_obj and coords_obj.is_resolved:
+            coordinates = (coords_obj.lat, coords_obj.lon)
+            cache.set(key, coordinates)
+            get_touch_buffer().touch([key])
             return coordinates
-        return None
+        now = timezone.now()
+        if coords_obj and coords_obj.in_backoff(now):
+            return None
+        if coords_obj is None:
+            coords_obj = self.model(address=address)
+        try:
+            coordinates = fetch_coordinates(address)
+        except GeocodingError as e:
+            logger.warning(e)
+            if e.reason not in TRANSIENT_REASONS:
+                coords_obj.mark_failed(e.reason, now)
+                coords_obj.save()
+            return None
+        coords_obj.mark_resolved(coordinates, now)
+        coords_obj.save()
+        cache.set(key, coordinates)
+        return coordinates
 
     def batch_get_coordinates(self, addresses):
         if not addresses:
             return {}
-        clean_addresses = [addr.strip() for addr in addresses if addr and addr.strip()]
-        if not clean_addresses:
+        clean_addresses = list(dict.fromkeys(addr.strip() for addr in addresses if addr and addr.strip()))
+        keys_by_address = {address: normalize_address(address) for address in clean_addresses}
+        addresses_by_key = {}
+        for address, key in keys_by_address.items():
+            if key:
+                addresses_by_key.setdefault(key, address)
+        if not addresses_by_key:
             return {}
-        coordinates = {}
-        addresses_to_fetch = []
-        existing_coords = self.filter(address__in=clean_addresses)
-        coords_by_address = {obj.address: obj for obj in existing_coords}
-        if existing_coords:
-            now = timezone.now()
-            self.filter(id__in=[obj.id for obj in existing_coords]).update(last_checked=now)
-        for address in clean_addresses:
-            if address in coords_by_address:
-                coords_obj = coords_by_address[address]
-                coordinates[address] = (coords_obj.lat, coords_obj.lon)
-            else:
-                addresses_to_fetch.append(address)
-        if addresses_to_fetch:
+        cache = get_coordinates_cache()
+        coordinates = cache.get_many(list(addresses_by_key))
+        get_touch_buffer().touch(coordinates)
+        uncached_keys = [key for key in addresses_by_key if key not in coordinates]
+        if uncached_keys:
+            coordinates.update(self._load_or_fetch(uncached_keys, addresses_by_key))
+        return {
+            address: coordinates[key]
+            for address, key in keys_by_address.items()
+            if key in coordinates
+        }
+
+    def _load_or_fetch(self, keys, addresses_by_key):
+        cache = get_coordinates_cache()
+        now = timezone.now()
+        existing_coords = list(self.filter(normalized_address__in=keys))
+        coords_by_key = self._pick_by_key(existing_coords)
+        get_touch_buffer().touch(key for key, obj in coords_by_key.items() if obj.is_resolved)
+        loaded = {}
+        keys_to_fetch = []
+        for key in keys:
+            coords_obj = coords_by_key.get(key)
+            if coords_obj is None:
+                keys_to_fetch.append(key)
+            elif coords_obj.is_resolved:
+                loaded[key] = (coords_obj.lat, coords_obj.lon)
+            elif not coords_obj.in_backoff(now):
+                keys_to_fetch.append(key)
+        if keys_to_fetch:
             new_coords_objects = []
-            for address in addresses_to_fetch:
-                coords = geocode_address(address)
-                if coords:
-                    coordinates[address] = coords
-                    new_coords_objects.append(self.model(
-                        address=address,
-                        lat=coords[0],
-                        lon=coords[1]
-                    ))
+            retried_coords_objects = []
+            found, failed = geocode_addresses([addresses_by_key[key] for key in keys_to_fetch])
+            for key in keys_to_fetch:
+                address = addresses_by_key[key]
+                if failed.get(address) in TRANSIENT_REASONS:
+                    continue
+                coords_obj = coords_by_key.get(key)
+                if coords_obj is None:
+                    coords_obj = self.model(address=address, normalized_address=key)
+                    new_coords_objects.append(coords_obj)
+                else:
+                    coords_obj.updated_at = now
+                    retried_coords_objects.append(coords_obj)
+                if address in found:
+                    coords_obj.mark_resolved(found[address], now)
+                    loaded[key] = found[address]
+                else:
+                    coords_obj.mark_failed(failed.get(address, INVALID_RESPONSE), now)
             if new_coords_objects:
-                self.bulk_create(new_coords_objects)
-        return coordinates
+                self.bulk_create(new_coords_objects, ignore_conflicts=True)
+            if retried_coords_objects:
+                self.bulk_update(retried_coords_objects, GEOCODING_FIELDS)
+                resolved_ids = [obj.id for obj in retried_coords_objects if obj.is_resolved]
+                if resolved_ids:
+                    coordinates_changed.send(sender=self.model, ids=resolved_ids)
+        cache.set_many(loaded)
+        return loaded
+
+    def stale(self, now=None):
+        threshold = (now or timezone.now()) - timedelta(days=settings.COORDINATES_REFRESH_AGE_DAYS)
+        # last_checked сдвигается при каждом чтении, поэтому возраст считаем от геокодирования
+        return self.filter(
+            models.Q(geocoded_at__lt=threshold) | models.Q(geocoded_at__isnull=True),
+            lat__isnull=False,
+            lon__isnull=False,
+        ).order_by(models.F('geocoded_at').asc(nulls_first=True))
+
+    def refresh_stale(self, batch_size=50, limit=None, rate_limit=None):
+        stats = {'checked': 0, 'refreshed': 0, 'failed': 0}
+        while limit is None or stats['checked'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - stats['checked'])
+            batch = list(self.stale()[:size])
+            if not batch:
+                break
+            found, failed = geocode_addresses([obj.address for obj in batch], rate_limit=rate_limit)
+            batch = [obj for obj in batch if failed.get(obj.address) not in TRANSIENT_REASONS]
+            if not batch:
+                break
+            now = timezone.now()
+            changed = []
+            for coords_obj in batch:
+                coordinates = found.get(coords_obj.address)
+                if coordinates and coordinates != (coords_obj.lat, coords_obj.lon):
+                    coords_obj.lat, coords_obj.lon = coordinates
+                    coords_obj.geocell = encode_geocell(*coordinates)
+                    coords_obj.updated_at = now
+                    changed.append(coords_obj)
+            if changed:
+                self.bulk_update(changed, ['lat', 'lon', 'geocell', 'updated_at'])
+                get_coordinates_cache().invalidate(*{obj.normalized_address for obj in changed})
+                coordinates_changed.send(sender=self.model, ids=[obj.id for obj in changed])
+            self.filter(id__in=[obj.id for obj in batch]).update(last_checked=now, geocoded_at=now)
+            stats['checked'] += len(batch)
+            stats['refreshed'] += len(changed)
+            stats['failed'] += sum(1 for obj in batch if obj.address in failed)
+        return stats
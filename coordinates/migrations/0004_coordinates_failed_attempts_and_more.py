@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coordinates', '0003_alter_coordinates_lat_alter_coordinates_lon'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coordinates',
+            name='failed_attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='неудачных попыток'),
+        ),
+        migrations.AddField(
+            model_name='coordinates',
+            name='failure_reason',
+            field=models.CharField(blank=True, choices=[('no_api_key', 'Не задан ключ API'), ('not_found', 'Адрес не найден'), ('network_error', 'Ошибка сети'), ('invalid_response', 'Некорректный ответ')], max_length=20, verbose_name='причина ошибки геокодирования'),
+        ),
+        migrations.AddField(
+            model_name='coordinates',
+            name='retry_after',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='повторить после'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+from coordinates.normalizers import normalize_address
+
+
+def fill_normalized_address(apps, schema_editor):
+    Coordinates = apps.get_model('coordinates', 'Coordinates')
+    coordinates = list(Coordinates.objects.only('id', 'address'))
+    for coords_obj in coordinates:
+        coords_obj.normalized_address = normalize_address(coords_obj.address)
+    Coordinates.objects.bulk_update(coordinates, ['normalized_address'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coordinates', '0004_coordinates_failed_attempts_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coordinates',
+            name='normalized_address',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200, verbose_name='нормализованный адрес'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_normalized_address, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coordinates', '0005_coordinates_normalized_address'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coordinates',
+            index=models.Index(fields=['last_checked'], name='coordinates_last_ch_e5ad66_idx'),
+        ),
+    ]
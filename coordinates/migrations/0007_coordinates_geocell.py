@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:40
+
+from django.db import migrations, models
+
+from coordinates.geocells import encode
+
+
+def fill_geocell(apps, schema_editor):
+    Coordinates = apps.get_model('coordinates', 'Coordinates')
+    coordinates = list(
+        Coordinates.objects.filter(lat__isnull=False, lon__isnull=False).only('id', 'lat', 'lon')
+    )
+    for coords_obj in coordinates:
+        coords_obj.geocell = encode(coords_obj.lat, coords_obj.lon)
+    Coordinates.objects.bulk_update(coordinates, ['geocell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coordinates', '0006_coordinates_coordinates_last_ch_e5ad66_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coordinates',
+            name='geocell',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='ячейка сетки'),
+        ),
+        migrations.RunPython(fill_geocell, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:05
+
+from django.db import migrations, models
+
+
+def fill_geocoded_at(apps, schema_editor):
+    # last_checked двигают чтения, а updated_at меняется только при записи результата геокодера
+    Coordinates = apps.get_model('coordinates', 'Coordinates')
+    Coordinates.objects.filter(lat__isnull=False, lon__isnull=False).update(geocoded_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coordinates', '0007_coordinates_geocell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coordinates',
+            name='geocoded_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='дата геокодирования'),
+        ),
+        migrations.RunPython(fill_geocoded_at, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,11 @@
+from datetime import timedelta
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
+from .geocells import encode as encode_geocell
 from .managers import CoordinatesManager
+from .normalizers import normalize_address
+from .services import FAILURE_REASONS
 
 
 class Coordinates(models.Model):
@@ -9,11 +14,27 @@ class Coordinates(models.Model):
         max_length=200,
         unique=True,
     )
+    normalized_address = models.CharField(
+        'нормализованный адрес',
+        max_length=200,
+        db_index=True,
+        editable=False,
+    )
     lat = models.FloatField('широта', null=True, blank=True)
     lon = models.FloatField('долгота', null=True, blank=True)
+    geocell = models.BigIntegerField('ячейка сетки', null=True, blank=True, db_index=True, editable=False)
     created_at = models.DateTimeField('дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('дата обновления', auto_now=True)
     last_checked = models.DateTimeField('дата последней проверки', default=timezone.now)
+    geocoded_at = models.DateTimeField('дата геокодирования', null=True, blank=True, db_index=True, editable=False)
+    failure_reason = models.CharField(
+        'причина ошибки геокодирования',
+        max_length=20,
+        choices=FAILURE_REASONS,
+        blank=True,
+    )
+    failed_attempts = models.PositiveIntegerField('неудачных попыток', default=0)
+    retry_after = models.DateTimeField('повторить после', null=True, blank=True, db_index=True)
 
     objects = CoordinatesManager()
 
@@ -23,10 +44,62 @@ class Coordinates(models.Model):
         indexes = [
             models.Index(fields=['address']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['last_checked']),
         ]
 
     def __str__(self):
         return f"{self.address} ({self.lat}, {self.lon})"
 
+    def save(self, *args, **kwargs):
+        self.normalized_address = normalize_address(self.address)
+        self.geocell = encode_geocell(self.lat, self.lon)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'address' in update_fields:
+                update_fields.add('normalized_address')
+            if update_fields & {'lat', 'lon'}:
+                update_fields.add('geocell')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     def needs_refresh(self):
-        return (timezone.now() - self.last_checked).days > 30
+        if self.geocoded_at is None:
+            return True
+        return (timezone.now() - self.geocoded_at).days > settings.COORDINATES_REFRESH_AGE_DAYS
+
+    @property
+    def is_resolved(self):
+        return self.lat is not None and self.lon is not None
+
+    @property
+    def position(self):
+        if not self.is_resolved:
+            return None
+        return (self.lat, self.lon)
+
+    def in_backoff(self, now=None):
+        if not self.retry_after:
+            return False
+        return self.retry_after > (now or timezone.now())
+    in_backoff.boolean = True
+    in_backoff.short_description = 'ожидает повтора'
+
+    def mark_resolved(self, coordinates, now=None):
+        self.lat, self.lon = coordinates
+        self.geocell = encode_geocell(*coordinates)
+        self.last_checked = self.geocoded_at = now or timezone.now()
+        self.failure_reason = ''
+        self.failed_attempts = 0
+        self.retry_after = None
+
+    def mark_failed(self, reason, now=None):
+        now = now or timezone.now()
+        self.failed_attempts += 1
+        delay = min(
+            settings.GEOCODER_RETRY_BASE * 2 ** (self.failed_attempts - 1),
+            settings.GEOCODER_RETRY_MAX,
+        )
+        self.failure_reason = reason
+        self.retry_after = now + timedelta(seconds=delay)
+        self.last_checked = now
@@ -0,0 +1,92 @@
+import re
+
+STREET_TYPES = {
+    'ул': 'улица',
+    'улица': 'улица',
+    'пр-т': 'проспект',
+    'пр-кт': 'проспект',
+    'просп': 'проспект',
+    'проспект': 'проспект',
+    'пер': 'переулок',
+    'переулок': 'переулок',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'бульвар': 'бульвар',
+    'ш': 'шоссе',
+    'шоссе': 'шоссе',
+    'наб': 'набережная',
+    'набережная': 'набережная',
+    'пл': 'площадь',
+    'площадь': 'площадь',
+    'пр-д': 'проезд',
+    'проезд': 'проезд',
+}
+
+BUILDING_PARTS = {
+    'корп': 'корпус',
+    'к': 'корпус',
+    'корпус': 'корпус',
+    'стр': 'строение',
+    'строение': 'строение',
+}
+
+HOUSE_MARKERS = {'д', 'дом'}
+CITY_MARKERS = {'г', 'город'}
+
+PUNCTUATION_RE = re.compile(r'[^\w\s/-]')
+NAME_RE = re.compile(r'[^\W\d_]+(?:-[^\W\d_]+)*')
+ORDINAL_RE = re.compile(r'\d+-[^\W\d_]{1,2}')
+
+
+def _is_name(token):
+    return bool(NAME_RE.fullmatch(token)) and token not in STREET_TYPES.values()
+
+
+def _is_ordinal(token):
+    return bool(ORDINAL_RE.fullmatch(token))
+
+
+def _tokenize(address):
+    address = address.lower().replace('ё', 'е')
+    address = PUNCTUATION_RE.sub(' ', address)
+    tokens = (token.strip('-') for token in address.split())
+    return [token for token in tokens if token]
+
+
+def _normalize_part(tokens):
+    normalized = []
+    for position, token in enumerate(tokens):
+        next_token = tokens[position + 1] if position + 1 < len(tokens) else ''
+        if token in HOUSE_MARKERS and next_token[:1].isdigit():
+            continue
+        normalized.append(STREET_TYPES.get(token) or BUILDING_PARTS.get(token) or token)
+
+    # "Тверская улица" и "улица Тверская" приводим к одному порядку: тип улицы перед названием
+    for position in range(1, len(normalized)):
+        token = normalized[position]
+        if token not in STREET_TYPES.values():
+            continue
+        next_token = normalized[position + 1] if position + 1 < len(normalized) else ''
+        if (_is_name(next_token) and next_token not in BUILDING_PARTS.values()) or _is_ordinal(next_token):
+            continue
+        # "улица 1905 года": за типом идёт название из числа и слова, а не номер дома
+        after_next = normalized[position + 2] if position + 2 < len(normalized) else ''
+        if next_token.isdigit() and _is_name(after_next) and after_next not in BUILDING_PARTS.values():
+            continue
+        target = position
+        if _is_name(normalized[target - 1]):
+            target -= 1
+            if target > 0 and _is_ordinal(normalized[target - 1]):
+                target -= 1
+        normalized.insert(target, normalized.pop(position))
+    return normalized
+
+
+def normalize_address(address):
+    if not address:
+        return ''
+    # Части между запятыми обрабатываем отдельно, чтобы тип улицы не переезжал через город
+    parts = [_tokenize(part) for part in address.split(',')]
+    if parts[0] and parts[0][0] in CITY_MARKERS:
+        parts[0] = parts[0][1:]
+    return ' '.join(token for part in parts for token in _normalize_part(part))
@@ -1,37 +1,233 @@
 import requests
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
-def geocode_address(address):
+class RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def is_open(self):
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Geocoder circuit breaker opened")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+_session = None
+_breaker = None
+_client_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _client_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.GEOCODER_POOL_SIZE,
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def get_circuit_breaker():
+    global _breaker
+    if _breaker is None:
+        with _client_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    settings.GEOCODER_BREAKER_THRESHOLD,
+                    settings.GEOCODER_BREAKER_RESET_TIMEOUT,
+                )
+    return _breaker
+
+
+NO_API_KEY = 'no_api_key'
+NOT_FOUND = 'not_found'
+NETWORK_ERROR = 'network_error'
+INVALID_RESPONSE = 'invalid_response'
+CIRCUIT_OPEN = 'circuit_open'
+
+FAILURE_REASONS = [
+    (NO_API_KEY, 'Не задан ключ API'),
+    (NOT_FOUND, 'Адрес не найден'),
+    (NETWORK_ERROR, 'Ошибка сети'),
+    (INVALID_RESPONSE, 'Некорректный ответ'),
+]
+
+# Эти ошибки говорят о состоянии геокодера, а не адреса, поэтому их не сохраняем
+TRANSIENT_REASONS = {CIRCUIT_OPEN}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GeocodingError(Exception):
+    def __init__(self, reason, message=''):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+def fetch_coordinates(address, timeout=None):
     if not settings.YANDEX_GEOCODER_API_KEY:
-        logger.warning("Yandex Geocoder API key not set")
-        return None
-    if not address or not address.strip():
-        return None
+        raise GeocodingError(NO_API_KEY, "Yandex Geocoder API key not set")
+    if timeout is None:
+        timeout = settings.GEOCODER_TIMEOUT
+    params = {
+        'geocode': address.strip(),
+        'apikey': settings.YANDEX_GEOCODER_API_KEY,
+        'format': 'json',
+        'results': 1
+    }
+    breaker = get_circuit_breaker()
+    if not breaker.allow():
+        raise GeocodingError(CIRCUIT_OPEN, f"Geocoder circuit breaker is open, skipping address '{address}'")
+    session = get_session()
+    retries = settings.GEOCODER_MAX_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(settings.GEOCODER_URL, params=params, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = GeocodingError(NETWORK_ERROR, f"Network error during geocoding for address '{address}': {e}")
+        except requests.exceptions.RequestException as e:
+            breaker.record_success()
+            raise GeocodingError(NETWORK_ERROR, f"Network error during geocoding for address '{address}': {e}")
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                break
+            error = GeocodingError(
+                NETWORK_ERROR,
+                f"Geocoder responded with {response.status_code} for address '{address}'",
+            )
+        if attempt == retries:
+            breaker.record_failure()
+            raise error
+        delay = settings.GEOCODER_RETRY_BACKOFF * 2 ** attempt
+        time.sleep(random.uniform(0, delay))
+    breaker.record_success()
     try:
-        base_url = "https://geocode-maps.yandex.ru/1.x"
-        params = {
-            'geocode': address.strip(),
-            'apikey': settings.YANDEX_GEOCODER_API_KEY,
-            'format': 'json',
-            'results': 1
-        }
-        response = requests.get(base_url, params=params, timeout=5)
         response.raise_for_status()
         data = response.json()
+    except requests.exceptions.RequestException as e:
+        raise GeocodingError(NETWORK_ERROR, f"Network error during geocoding for address '{address}': {e}")
+    except ValueError as e:
+        raise GeocodingError(INVALID_RESPONSE, f"Geocoding error for address '{address}': {e}")
+    try:
         features = data['response']['GeoObjectCollection']['featureMember']
         if not features:
-            logger.warning(f"No coordinates found for address: {address}")
-            return None
+            raise GeocodingError(NOT_FOUND, f"No coordinates found for address: {address}")
         pos = features[0]['GeoObject']['Point']['pos']
         lon, lat = map(float, pos.split())
-        return (lat, lon)
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Network error during geocoding for address '{address}': {e}")
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise GeocodingError(INVALID_RESPONSE, f"Geocoding error for address '{address}': {e}")
+    return (lat, lon)
+
+
+def geocode_address(address, timeout=None):
+    if not address or not address.strip():
         return None
-    except Exception as e:
-        logger.error(f"Geocoding error for address '{address}': {e}")
+    try:
+        return fetch_coordinates(address, timeout=timeout)
+    except GeocodingError as e:
+        if e.reason in (NO_API_KEY, NOT_FOUND):
+            logger.warning(e)
+        else:
+            logger.error(e)
         return None
+
+
+def geocode_addresses(addresses, max_workers=None, rate_limit=None, timeout=None):
+    addresses = list(dict.fromkeys(addresses))
+    found = {}
+    failed = {}
+    if not addresses:
+        return found, failed
+    if max_workers is None:
+        max_workers = settings.GEOCODER_MAX_WORKERS
+    if rate_limit is None:
+        rate_limit = settings.GEOCODER_RATE_LIMIT
+    limiter = RateLimiter(rate_limit)
+    breaker = get_circuit_breaker()
+
+    def fetch(address):
+        if breaker.is_open():
+            raise GeocodingError(CIRCUIT_OPEN, f"Geocoder circuit breaker is open, skipping address '{address}'")
+        limiter.wait()
+        return fetch_coordinates(address, timeout=timeout)
+
+    workers = max(1, min(max_workers, len(addresses)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='geocoder') as executor:
+        futures = {executor.submit(fetch, address): address for address in addresses}
+        for future in as_completed(futures):
+            address = futures[future]
+            try:
+                found[address] = future.result()
+            except GeocodingError as e:
+                logger.warning(e)
+                failed[address] = e.reason
+            except Exception as e:
+                logger.error(f"Geocoding worker failed for address '{address}': {e}")
+                failed[address] = INVALID_RESPONSE
+    return found, failed
@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# Отправляется, когда координаты меняются в обход save(): bulk_update, update()
+coordinates_changed = Signal()
@@ -0,0 +1,102 @@
+import math
+from collections import defaultdict
+
+from .utils import KM_PER_DEGREE, distance_matrix
+
+
+class GridIndex:
+    def __init__(self, points, cell_km=2.0, linear_scan_size=0, method='haversine'):
+        points = [(item, position) for item, position in points if position]
+        self.cell_km = cell_km
+        self.method = method
+        # на маленьком наборе один векторный проход быстрее обхода колец
+        self.linear_scan_size = linear_scan_size
+        # по долготе клетка не уже cell_km на любой широте из набора точек
+        reference_lat = max((abs(position[0]) for _, position in points), default=0)
+        self.cell_lat = cell_km / KM_PER_DEGREE
+        self.cell_lon = cell_km / (KM_PER_DEGREE * max(math.cos(math.radians(reference_lat)), 0.01))
+        self.buckets = defaultdict(list)
+        for item, position in points:
+            self.buckets[self._cell(*position)].append((item, position))
+        self.points = points
+        self.size = len(points)
+        rows = [row for row, _ in self.buckets]
+        columns = [column for _, column in self.buckets]
+        self.bounds = (min(rows), max(rows), min(columns), max(columns)) if points else None
+
+    def __len__(self):
+        return self.size
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_lat), math.floor(lon / self.cell_lon))
+
+    def _ring(self, center, radius):
+        row, column = center
+        if radius == 0:
+            yield center
+            return
+        for offset in range(-radius, radius + 1):
+            yield (row - radius, column + offset)
+            yield (row + radius, column + offset)
+        for offset in range(-radius + 1, radius):
+            yield (row + offset, column - radius)
+            yield (row + offset, column + radius)
+
+    def _scan(self, lat, lon, points, k=None, radius_km=None, predicate=None):
+        candidates = [
+            (item, position) for item, position in points
+            if predicate is None or predicate(item)
+        ]
+        if not candidates:
+            return []
+        distances = distance_matrix(
+            [(lat, lon)], [position for _, position in candidates], method=self.method,
+        )[0]
+        found = [
+            (item, float(distance))
+            for (item, _), distance in zip(candidates, distances)
+            if radius_km is None or distance <= radius_km
+        ]
+        found.sort(key=lambda pair: pair[1])
+        return found[:k] if k else found
+
+    def nearest(self, lat, lon, k=None, radius_km=None, predicate=None):
+        if not self.size:
+            return []
+        if self.size <= self.linear_scan_size:
+            return self._scan(lat, lon, self.points, k, radius_km, predicate)
+        center = self._cell(lat, lon)
+        min_row, max_row, min_column, max_column = self.bounds
+        max_ring = max(
+            center[0] - min_row, max_row - center[0],
+            center[1] - min_column, max_column - center[1],
+            0,
+        )
+        if radius_km is not None:
+            # между запросом и точками кольца ring лежит не меньше ring - 1 полных клеток
+            max_ring = min(max_ring, math.floor(radius_km / self.cell_km) + 1)
+        found = []
+        for ring in range(max_ring + 1):
+            nearest_possible = max(ring - 1, 0) * self.cell_km
+            if k and len(found) >= k and nearest_possible > found[k - 1][1]:
+                break
+            if 8 * ring > len(self.buckets):
+                # кольцо длиннее списка непустых клеток: дальние клетки проще досмотреть разом
+                rest = [
+                    point
+                    for (row, column), points in self.buckets.items()
+                    if max(abs(row - center[0]), abs(column - center[1])) >= ring
+                    for point in points
+                ]
+                found.extend(self._scan(lat, lon, rest, radius_km=radius_km, predicate=predicate))
+                found.sort(key=lambda pair: pair[1])
+                break
+            candidates = [
+                point
+                for cell in self._ring(center, ring)
+                for point in self.buckets.get(cell, ())
+            ]
+            if candidates:
+                found.extend(self._scan(lat, lon, candidates, radius_km=radius_km, predicate=predicate))
+                found.sort(key=lambda pair: pair[1])
+        return found[:k] if k else found
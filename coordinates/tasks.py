@@ -0,0 +1,91 @@
+import logging
+import queue
+import threading
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from .signals import coordinates_changed
+
+logger = logging.getLogger(__name__)
+
+
+class GeocodingQueue:
+    def __init__(self, maxsize):
+        self._queue = queue.Queue(maxsize)
+        self._counters = {'enqueued': 0, 'processed': 0, 'failed': 0, 'dropped': 0}
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name='geocoding-queue',
+                    daemon=True,
+                )
+                self._worker.start()
+
+    def enqueue(self, address, instance=None):
+        if not address or not address.strip():
+            return False
+        self._ensure_worker()
+        link = (type(instance), instance.pk) if instance is not None else None
+        try:
+            self._queue.put_nowait((address, link))
+        except queue.Full:
+            logger.warning(f"Geocoding queue is full, dropping address '{address}'")
+            self._count('dropped')
+            return False
+        self._count('enqueued')
+        return True
+
+    def _run(self):
+        Coordinates = apps.get_model('coordinates', 'Coordinates')
+        while True:
+            address, link = self._queue.get()
+            try:
+                coordinates = Coordinates.objects.get_or_fetch_coordinates(address)
+                # Привязываем только разобранный адрес: непривязанный заказ view_orders геокодирует повторно
+                if link and coordinates:
+                    model, pk = link
+                    coords_obj = Coordinates.objects.for_address(address)
+                    if coords_obj and model.objects.filter(pk=pk, address=address).update(coordinates=coords_obj):
+                        coordinates_changed.send(sender=Coordinates, ids=[coords_obj.id])
+                self._count('processed' if coordinates else 'failed')
+            except Exception as e:
+                logger.error(f"Background geocoding failed for address '{address}': {e}")
+                self._count('failed')
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    def join(self):
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_geocoding_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = GeocodingQueue(settings.GEOCODING_QUEUE_SIZE)
+    return _queue
+
+
+def enqueue_geocoding(address, instance=None):
+    return get_geocoding_queue().enqueue(address, instance)
@@ -1,3 +1,308 @@
-from django.test import TestCase
+import json
+import math
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from foodcartapp.models import Restaurant
+
+from . import services
+from .cache import CoordinatesCache, get_coordinates_cache
+from .models import Coordinates
+from .normalizers import normalize_address
+from .spatial import GridIndex
+
+
+class GeocoderStub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.clients.add(self.client_address)
+            status = server.statuses.pop(0) if server.statuses else 200
+        address = parse_qs(urlparse(self.path).query)['geocode'][0]
+        if status == 200:
+            features = [] if address == 'nowhere' else [
+                {'GeoObject': {'Point': {'pos': '37.61 55.75'}}},
+            ]
+            body = json.dumps({'response': {'GeoObjectCollection': {'featureMember': features}}})
+        else:
+            body = '{}'
+        body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GeocoderServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), GeocoderStub)
+        cls.server.lock = threading.Lock()
+        thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        thread.start()
+        cls.settings_override = override_settings(
+            GEOCODER_URL=f'http://127.0.0.1:{cls.server.server_port}/1.x',
+            YANDEX_GEOCODER_API_KEY='test-key',
+            GEOCODER_MAX_RETRIES=2,
+            GEOCODER_RETRY_BACKOFF=0,
+            GEOCODER_BREAKER_THRESHOLD=2,
+            GEOCODER_BREAKER_RESET_TIMEOUT=60,
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.requests = 0
+        self.server.clients = set()
+        self.server.statuses = []
+        for name in ('_session', '_breaker'):
+            patcher = mock.patch.object(services, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class GeocodeAddressTest(GeocoderServerMixin, SimpleTestCase):
+    def test_returns_lat_lon(self):
+        self.assertEqual(services.geocode_address('Москва, Красная площадь'), (55.75, 37.61))
+
+    def test_not_found(self):
+        with self.assertRaises(services.GeocodingError) as error:
+            services.fetch_coordinates('nowhere')
+        self.assertEqual(error.exception.reason, services.NOT_FOUND)
+
+    def test_reuses_pooled_connection(self):
+        for number in range(5):
+            services.geocode_address(f'адрес {number}')
+        self.assertEqual(self.server.requests, 5)
+        self.assertEqual(len(self.server.clients), 1)
+
+    def test_retries_server_errors(self):
+        self.server.statuses = [503, 429]
+        self.assertEqual(services.geocode_address('Москва'), (55.75, 37.61))
+        self.assertEqual(self.server.requests, 3)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.statuses = [500, 500, 500]
+        with self.assertRaises(services.GeocodingError) as error:
+            services.fetch_coordinates('Москва')
+        self.assertEqual(error.exception.reason, services.NETWORK_ERROR)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_circuit_breaker_fails_fast(self):
+        self.server.statuses = [500] * 6
+        for _ in range(2):
+            self.assertIsNone(services.geocode_address('Москва'))
+        self.assertEqual(self.server.requests, 6)
+
+        with self.assertRaises(services.GeocodingError) as error:
+            services.fetch_coordinates('Москва')
+        self.assertEqual(error.exception.reason, services.CIRCUIT_OPEN)
+        found, failed = services.geocode_addresses(['Тверская 1', 'Тверская 2'])
+        self.assertEqual(found, {})
+        self.assertEqual(set(failed.values()), {services.CIRCUIT_OPEN})
+        self.assertEqual(self.server.requests, 6)
+
+    def test_circuit_breaker_closes_after_successful_probe(self):
+        breaker = services.get_circuit_breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open())
+        breaker.opened_at -= 60
+        self.assertEqual(services.geocode_address('Москва'), (55.75, 37.61))
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+
+class BatchGetCoordinatesTest(GeocoderServerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        get_coordinates_cache().clear()
+
+    def test_fetches_and_stores_missing_addresses(self):
+        coordinates = Coordinates.objects.batch_get_coordinates(['Москва, ул. Тверская 1', 'nowhere'])
+        self.assertEqual(coordinates, {'Москва, ул. Тверская 1': (55.75, 37.61)})
+        failed = Coordinates.objects.get(address='nowhere')
+        self.assertEqual(failed.failure_reason, services.NOT_FOUND)
+        self.assertTrue(failed.in_backoff())
+
+    def test_due_failed_row_is_resolved_in_place(self):
+        failed = Coordinates.objects.create(address='Москва, ул. Тверская 1')
+        failed.mark_failed(services.NOT_FOUND)
+        failed.retry_after -= timedelta(days=1)
+        failed.save()
+        coordinates = Coordinates.objects.batch_get_coordinates(['Москва, ул. Тверская 1'])
+        self.assertEqual(coordinates, {'Москва, ул. Тверская 1': (55.75, 37.61)})
+        failed.refresh_from_db()
+        self.assertEqual(failed.position, (55.75, 37.61))
+        self.assertIsNone(failed.retry_after)
+
+    def test_open_circuit_skips_geocoder_without_recording_failures(self):
+        breaker = services.get_circuit_breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        coordinates = Coordinates.objects.batch_get_coordinates(['Москва, ул. Тверская 1'])
+        self.assertEqual(coordinates, {})
+        self.assertEqual(self.server.requests, 0)
+        self.assertFalse(Coordinates.objects.exists())
+
+
+class MergeDuplicateCoordinatesTest(TestCase):
+    def test_duplicates_are_relinked_to_keeper(self):
+        keeper = Coordinates.objects.create(address='Москва, Тверская 1', lat=55.75, lon=37.61)
+        duplicate = Coordinates.objects.create(address='москва,  тверская 1')
+        restaurant = Restaurant.objects.create(name='Star Burger', address='Москва, Тверская 1')
+        Restaurant.objects.filter(pk=restaurant.pk).update(coordinates=duplicate)
+        call_command('merge_duplicate_coordinates', stdout=StringIO())
+        self.assertFalse(Coordinates.objects.filter(pk=duplicate.pk).exists())
+        restaurant.refresh_from_db()
+        self.assertEqual(restaurant.coordinates_id, keeper.pk)
+
+
+class StaleCoordinatesTest(TestCase):
+    def test_reads_do_not_hide_old_geocoding(self):
+        now = timezone.now()
+        coords_obj = Coordinates.objects.create(address='Москва, Тверская 1')
+        coords_obj.mark_resolved((55.75, 37.61), now - timedelta(days=365))
+        coords_obj.last_checked = now
+        coords_obj.save()
+        fresh = Coordinates.objects.create(address='Москва, Тверская 2')
+        fresh.mark_resolved((55.76, 37.60), now)
+        fresh.save()
+        self.assertEqual(list(Coordinates.objects.stale(now)), [coords_obj])
+
+
+class CoordinatesCacheTest(TestCase):
+    @override_settings(COORDINATES_CACHE_SYNC_INTERVAL=0)
+    def test_invalidation_reaches_other_processes(self):
+        writer, reader = CoordinatesCache(), CoordinatesCache()
+        writer.set('москва тверская 1', (55.75, 37.61))
+        self.assertEqual(reader.get('москва тверская 1'), (55.75, 37.61))
+        writer.invalidate('москва тверская 1')
+        self.assertIsNone(reader.get('москва тверская 1'))
+
+
+class CoordinatesWithinTest(TestCase):
+    def test_bulk_created_rows_are_found(self):
+        Coordinates.objects.bulk_create([Coordinates(address='Москва,  Тверская 1', lat=55.7575, lon=37.6130)])
+        coords_obj = Coordinates.objects.get()
+        self.assertEqual(coords_obj.normalized_address, normalize_address('Москва, Тверская 1'))
+        self.assertEqual(Coordinates.objects.within(55.7540, 37.6200, radius_km=2), [coords_obj])
+
+    def test_returns_points_inside_radius_sorted_by_distance(self):
+        center = Coordinates.objects.create(address='Москва, Красная площадь', lat=55.7539, lon=37.6208)
+        near = Coordinates.objects.create(address='Москва, Тверская 1', lat=55.7575, lon=37.6130)
+        Coordinates.objects.create(address='Химки', lat=55.8970, lon=37.4297)
+        Coordinates.objects.create(address='nowhere')
+        found = Coordinates.objects.within(55.7540, 37.6200, radius_km=2)
+        self.assertEqual(found, [center, near])
+        self.assertLess(found[0].distance, found[1].distance)
+        self.assertIn(near, Coordinates.objects.near(55.7540, 37.6200, radius_km=2))
+
+    def test_local_hits_skip_shared_cache(self):
+        coordinates_cache = CoordinatesCache()
+        coordinates_cache.set('москва тверская 1', (55.75, 37.61))
+        coordinates_cache.get('москва тверская 1')
+        with mock.patch.object(CoordinatesCache, 'shared') as shared:
+            self.assertEqual(coordinates_cache.get('москва тверская 1'), (55.75, 37.61))
+        self.assertFalse(shared.mock_calls)
+
+
+class NormalizeAddressTest(SimpleTestCase):
+    def assert_same_key(self, *addresses):
+        keys = {normalize_address(address) for address in addresses}
+        self.assertEqual(len(keys), 1, keys)
+
+    def test_request_examples_share_a_key(self):
+        self.assert_same_key('Москва, ул. Тверская 1', 'москва ул тверская, 1', 'Москва,  Тверская улица 1')
+        self.assertEqual(normalize_address('Москва, ул. Тверская 1'), 'москва улица тверская 1')
+
+    def test_numbered_street_keeps_city_first(self):
+        self.assertEqual(normalize_address('Москва, ул. 1905 года, 7'), 'москва улица 1905 года 7')
+        self.assert_same_key('Москва, ул. 1905 года, 7', 'Москва, улица 1905 года, д. 7', 'Москва ул 1905 года 7')
+
+    def test_markers_and_building_parts(self):
+        self.assert_same_key('г. Москва, Тверская ул., д. 1, корп. 2', 'Москва, ул. Тверская, 1 к 2')
+        self.assert_same_key('Москва, Ленинский пр-т 1', 'Москва, Ленинский проспект, д 1')
+
+    def test_ordinal_street_names(self):
+        self.assert_same_key('Москва, 3-я Тверская-Ямская ул., 1', 'Москва, ул. 3-я Тверская-Ямская 1')
+
+    def test_empty_address(self):
+        self.assertEqual(normalize_address(''), '')
+        self.assertEqual(normalize_address(' , '), '')
+
+
+class GridIndexTest(SimpleTestCase):
+    # Центр Москвы, две точки рядом и одна в Санкт-Петербурге
+    POINTS = [
+        ('kremlin', (55.7520, 37.6175)),
+        ('tverskaya', (55.7575, 37.6130)),
+        ('arbat', (55.7494, 37.5912)),
+        ('spb', (59.9343, 30.3351)),
+    ]
+
+    def test_matches_linear_scan(self):
+        grid = GridIndex(self.POINTS, cell_km=1)
+        linear = GridIndex(self.POINTS, cell_km=1, linear_scan_size=len(self.POINTS))
+        for k in (1, 2, None):
+            self.assertEqual(grid.nearest(55.7530, 37.6200, k=k), linear.nearest(55.7530, 37.6200, k=k))
+        self.assertEqual([item for item, _ in grid.nearest(55.7530, 37.6200)], ['kremlin', 'tverskaya', 'arbat', 'spb'])
+
+    def test_far_cells_are_pruned(self):
+        # Кольцо точек в ~20 км от центра, чтобы непустых клеток было больше, чем в ближних кольцах
+        suburbs = [
+            (f'suburb-{angle}', (55.7520 + 0.18 * math.sin(math.radians(angle)),
+                                 37.6175 + 0.32 * math.cos(math.radians(angle))))
+            for angle in range(0, 360, 9)
+        ]
+        checked = []
+        grid = GridIndex(self.POINTS + suburbs, cell_km=1)
+        nearest = grid.nearest(55.7530, 37.6200, k=1, predicate=lambda item: checked.append(item) or True)
+        self.assertEqual(nearest[0][0], 'kremlin')
+        self.assertNotIn('spb', checked)
+        self.assertFalse(any(item.startswith('suburb') for item in checked))
+
+    def test_radius_limits_results(self):
+        grid = GridIndex(self.POINTS, cell_km=1)
+        nearest = grid.nearest(55.7530, 37.6200, radius_km=1)
+        self.assertEqual([item for item, _ in nearest], ['kremlin', 'tverskaya'])
+        self.assertTrue(all(distance <= 1 for _, distance in nearest))
+
+    def test_predicate_filters_items(self):
+        grid = GridIndex(self.POINTS, cell_km=1)
+        nearest = grid.nearest(55.7530, 37.6200, k=1, predicate=lambda item: item == 'spb')
+        self.assertEqual([item for item, _ in nearest], ['spb'])
+
+    def test_small_index_skips_ring_search(self):
+        grid = GridIndex(self.POINTS, cell_km=1, linear_scan_size=10)
+        with mock.patch.object(GridIndex, '_ring') as ring:
+            nearest = grid.nearest(55.7530, 37.6200, k=2)
+        ring.assert_not_called()
+        self.assertEqual([item for item, _ in nearest], ['kremlin', 'tverskaya'])
+
+    def test_empty_index(self):
+        self.assertEqual(GridIndex([('nowhere', None)]).nearest(55.75, 37.62, k=1), [])
@@ -0,0 +1,71 @@
+import logging
+import threading
+import time
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 500
+
+
+class TouchBuffer:
+    def __init__(self, interval):
+        self.interval = interval
+        self._keys = set()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def touch(self, keys):
+        with self._lock:
+            self._keys.update(keys)
+
+    def pending(self):
+        with self._lock:
+            return len(self._keys)
+
+    def is_due(self):
+        return time.monotonic() - self._last_flush >= self.interval
+
+    def flush_if_due(self):
+        if self._keys and self.is_due():
+            return self.flush()
+        return 0
+
+    def flush(self):
+        with self._lock:
+            keys = list(self._keys)
+            self._keys = set()
+            self._last_flush = time.monotonic()
+        if not keys:
+            return 0
+        Coordinates = apps.get_model('coordinates', 'Coordinates')
+        now = timezone.now()
+        updated = 0
+        for start in range(0, len(keys), FLUSH_BATCH_SIZE):
+            updated += Coordinates.objects.filter(
+                normalized_address__in=keys[start:start + FLUSH_BATCH_SIZE],
+            ).update(last_checked=now)
+        logger.debug(f"Flushed last_checked for {updated} coordinates")
+        return updated
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_touch_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = TouchBuffer(settings.COORDINATES_TOUCH_FLUSH_INTERVAL)
+    return _buffer
+
+
+def flush_touches_if_due(**kwargs):
+    try:
+        get_touch_buffer().flush_if_due()
+    except Exception as e:
+        logger.error(f"Failed to flush coordinates touches: {e}")
@@ -1,9 +1,13 @@
 import logging
+import math
+import numpy as np
 from geopy.distance import distance
-from .models import Coordinates
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
 
 def calculate_distance(coords1, coords2):
     if not coords1 or not coords2:
@@ -16,9 +20,69 @@ def calculate_distance(coords1, coords2):
         return None
 
 
+def _as_points(coords):
+    points = np.full((len(coords), 2), np.nan)
+    for index, point in enumerate(coords):
+        if point:
+            points[index] = point
+    return points
+
+
+def distance_matrix(origins, destinations, method='haversine'):
+    origins = _as_points(origins)
+    destinations = _as_points(destinations)
+    if method == 'geodesic':
+        matrix = np.full((len(origins), len(destinations)), np.nan)
+        for row, origin in enumerate(origins):
+            if np.isnan(origin).any():
+                continue
+            for column, destination in enumerate(destinations):
+                if not np.isnan(destination).any():
+                    matrix[row, column] = distance(origin, destination).km
+        return matrix
+    if method != 'haversine':
+        raise ValueError(f"Unknown distance method: {method}")
+    lat1, lon1 = np.radians(origins).T[:, :, np.newaxis]
+    lat2, lon2 = np.radians(destinations).T[:, np.newaxis, :]
+    return _haversine(lat1, lon1, lat2, lon2)
+
+
+def paired_distances(origins, destinations, method='haversine'):
+    origins = _as_points(origins)
+    destinations = _as_points(destinations)
+    if method == 'geodesic':
+        distances = np.full(len(origins), np.nan)
+        for row, (origin, destination) in enumerate(zip(origins, destinations)):
+            if not np.isnan(origin).any() and not np.isnan(destination).any():
+                distances[row] = distance(origin, destination).km
+        return distances
+    if method != 'haversine':
+        raise ValueError(f"Unknown distance method: {method}")
+    lat1, lon1 = np.radians(origins).T
+    lat2, lon2 = np.radians(destinations).T
+    return _haversine(lat1, lon1, lat2, lon2)
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    hav = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(hav, 0, 1)))
+
+
+def round_distance(value):
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), 2)
+
+
 def get_distance_between_addresses(address1, address2):
+    # models импортирует geocells, а тот — константы отсюда
+    from .models import Coordinates
+
     coords1 = Coordinates.objects.get_or_fetch_coordinates(address1)
     coords2 = Coordinates.objects.get_or_fetch_coordinates(address2)
     if not coords1 or not coords2:
         return None
-    return calculate_distance(coords1, coords2)
\ No newline at end of file
+    return calculate_distance(coords1, coords2)
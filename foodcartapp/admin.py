@@ -2,14 +2,14 @@ from django.contrib import admin
 from django.shortcuts import reverse, redirect
 from django.templatetags.static import static
 from django.utils.html import format_html
-from django.db.models import Sum, F, Count
+from django.db.models import F
 from django.utils import timezone
 from django.contrib import messages
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.conf import settings
 
 
-from .models import Product, ProductCategory, Restaurant, RestaurantMenuItem, Order, OrderItem
+from .models import Banner, Product, ProductCategory, Restaurant, RestaurantMenuItem, Order, OrderItem
 
 
 class RestaurantMenuItemInline(admin.TabularInline):
@@ -41,16 +41,16 @@ class ProductAdmin(admin.ModelAdmin):
         css = {"all": (static("admin/foodcartapp.css"))}
 
     def get_image_preview(self, obj):
-        if not obj.image:
+        if not obj.image and not obj.static_image:
             return 'выберите картинку'
-        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image_url)
     get_image_preview.short_description = 'превью'
 
     def get_image_list_preview(self, obj):
         if not obj.image or not obj.id:
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
-        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.image.url)
+        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.get_thumbnail_url())
     get_image_list_preview.short_description = 'превью'
 
 
@@ -59,6 +59,29 @@ class ProductCategoryAdmin(admin.ModelAdmin):
     pass
 
 
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = ['get_image_list_preview', 'title', 'order', 'is_active', 'active_from', 'active_until']
+    list_display_links = ['title']
+    list_editable = ['order', 'is_active']
+    list_filter = ['is_active']
+    search_fields = ['title', 'text']
+    fields = ['title', 'text', 'image', 'static_image', 'get_image_preview', 'order', 'is_active', 'active_from', 'active_until']
+    readonly_fields = ['get_image_preview']
+
+    def get_image_preview(self, obj):
+        if not obj.image and not obj.static_image:
+            return 'выберите картинку'
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image_url)
+    get_image_preview.short_description = 'превью'
+
+    def get_image_list_preview(self, obj):
+        if not obj.image and not obj.static_image:
+            return 'нет картинки'
+        return format_html('<img src="{src}" style="max-height: 50px;"/>', src=obj.image_url)
+    get_image_list_preview.short_description = 'превью'
+
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
@@ -118,26 +141,20 @@ class OrderAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
             'assigned_restaurant'
-        ).prefetch_related(
-            'items',
-            'items__product'
-        ).annotate(
-            total_price=Sum(F('items__quantity') * F('items__price')),
-            items_count=Count('items')
         )
 
-    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if not change or any(formset.has_changed() for formset in formsets):
+            form.instance.update_totals()
+
     def get_items_count(self, obj):
-        if hasattr(obj, 'items_count') and obj.items_count is not None:
-            return obj.items_count
-        return obj.items.count()
+        return obj.items_count
     get_items_count.short_description = 'кол-во позиций'
     get_items_count.admin_order_field = 'items_count'
 
     def get_total_display(self, obj):
-        if hasattr(obj, 'total_price') and obj.total_price is not None:
-            return f"{obj.total_price:.2f} руб."
-        return "0.00 руб."
+        return f"{obj.total_price:.2f} руб."
     get_total_display.short_description = 'сумма заказа'
     get_total_display.admin_order_field = 'total_price'
 
@@ -164,6 +181,26 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_display = ['order', 'product', 'quantity', 'price', 'get_subtotal']
     list_filter = ['order__status']
     list_select_related = ['order', 'product']
+
+    # Итоги заказа хранятся в самом заказе, поэтому пересчитываем их после правки позиций
+    def save_model(self, request, obj, form, change):
+        previous_order_id = form.initial.get('order') if change else None
+        super().save_model(request, obj, form, change)
+        obj.order.update_totals()
+        if previous_order_id and previous_order_id != obj.order_id:
+            Order.objects.get(pk=previous_order_id).update_totals()
+
+    def delete_model(self, request, obj):
+        order = obj.order
+        super().delete_model(request, obj)
+        order.update_totals()
+
+    def delete_queryset(self, request, queryset):
+        order_ids = set(queryset.values_list('order_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for order in Order.objects.filter(pk__in=order_ids):
+            order.update_totals()
+
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
             'order', 'product'
@@ -0,0 +1,85 @@
+from collections import defaultdict
+
+from .snapshots import VersionedSnapshot
+
+BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+CAPABLE_CACHE_SIZE = 10000
+
+
+class AvailabilityMatrix:
+    def __init__(self, restaurants, menu):
+        self.restaurants = list(restaurants)
+        product_ids = sorted({product_id for _, product_id in menu})
+        self.product_bits = {product_id: 1 << bit for bit, product_id in enumerate(product_ids)}
+        masks = defaultdict(int)
+        for restaurant_id, product_id in menu:
+            masks[restaurant_id] |= self.product_bits[product_id]
+        self.restaurant_masks = {
+            restaurant.id: masks[restaurant.id]
+            for restaurant in self.restaurants
+        }
+        # Транспонированная матрица: для каждого товара — маска ресторанов, где он есть
+        self.product_restaurants = defaultdict(int)
+        restaurant_bits = {restaurant.id: bit for bit, restaurant in enumerate(self.restaurants)}
+        for restaurant_id, product_id in menu:
+            if restaurant_id in restaurant_bits:
+                self.product_restaurants[product_id] |= 1 << restaurant_bits[restaurant_id]
+        self._capable_cache = {}
+
+    @classmethod
+    def build(cls):
+        from .models import Restaurant, RestaurantMenuItem
+        menu = list(
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .values_list('restaurant_id', 'product_id')
+        )
+        restaurants = Restaurant.objects.select_related('coordinates').order_by('name')
+        return cls(restaurants, menu)
+
+    def mask(self, product_ids):
+        mask = 0
+        for product_id in product_ids:
+            bit = self.product_bits.get(product_id)
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
+
+    @property
+    def available_product_ids(self):
+        return self.product_bits.keys()
+
+    def restaurant_availability(self, product_id):
+        bit = self.product_bits.get(product_id, 0)
+        return [
+            bool(self.restaurant_masks[restaurant.id] & bit)
+            for restaurant in self.restaurants
+        ]
+
+    def capable_restaurants(self, product_ids):
+        order_mask = self.mask(product_ids)
+        if not order_mask:
+            return []
+        capable = self._capable_cache.get(order_mask)
+        if capable is None:
+            restaurants_mask = -1
+            for product_id in product_ids:
+                restaurants_mask &= self.product_restaurants[product_id]
+            capable = []
+            if restaurants_mask > 0:
+                mask_bytes = restaurants_mask.to_bytes((restaurants_mask.bit_length() + 7) // 8, 'little')
+                for offset, byte in enumerate(mask_bytes):
+                    for bit in BYTE_BITS[byte]:
+                        capable.append(self.restaurants[offset * 8 + bit])
+            if len(self._capable_cache) >= CAPABLE_CACHE_SIZE:
+                self._capable_cache.clear()
+            self._capable_cache[order_mask] = capable
+        return list(capable)
+
+
+availability_matrix = VersionedSnapshot('foodcartapp:availability_version', AvailabilityMatrix.build)
+
+
+def get_availability_matrix():
+    return availability_matrix.get()
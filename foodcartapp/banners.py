@@ -0,0 +1,25 @@
+from .payloads import EncodedPayload, SharedPayload
+
+
+def build_banners_payload():
+    from .models import Banner
+
+    banners = Banner.objects.active()
+    return EncodedPayload.from_data(
+        [
+            {
+                'title': banner.title,
+                'src': banner.image_url,
+                'text': banner.text,
+            }
+            for banner in banners
+        ],
+        expires_at=Banner.objects.next_change(),
+    )
+
+
+banners = SharedPayload('foodcartapp:banners', build_banners_payload)
+
+
+def get_banners():
+    return banners.get()
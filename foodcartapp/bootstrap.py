@@ -0,0 +1,13 @@
+from .banners import banners
+from .catalog import catalog, categories
+from .payloads import CompositePayload
+
+bootstrap = CompositePayload('foodcartapp:bootstrap', {
+    'banners': banners,
+    'categories': categories,
+    'products': catalog,
+})
+
+
+def get_bootstrap():
+    return bootstrap.get()
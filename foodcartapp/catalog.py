@@ -0,0 +1,70 @@
+from .payloads import EncodedPayload, SharedPayload
+from .search import normalize_search_text
+
+
+CATALOG_FIELDS = [
+    'id', 'name', 'price', 'special_status', 'description', 'category', 'image', 'image_srcset', 'restaurant',
+]
+
+
+def serialize_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': product.price,
+        'special_status': product.special_status,
+        'description': product.description,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+        } if product.category else None,
+        'image': product.image.url,
+        'image_srcset': product.get_image_srcset(),
+        'restaurant': {
+            'id': product.id,
+            'name': product.name,
+        }
+    }
+
+
+def build_catalog():
+    from .models import Product
+
+    products = Product.objects.select_related('category').available().order_by('id')
+    return [serialize_product(product) for product in products]
+
+
+def search_products(query='', category_ids=None, special=None):
+    from .models import Product
+
+    products = Product.objects.select_related('category').available()
+    for token in normalize_search_text(query).split():
+        products = products.filter(search_name__contains=token)
+    if category_ids:
+        products = products.filter(category_id__in=category_ids)
+    if special is not None:
+        products = products.filter(special_status=special)
+    return products.order_by('id')
+
+
+def build_catalog_payload():
+    return EncodedPayload.from_data(build_catalog())
+
+
+catalog = SharedPayload('foodcartapp:catalog', build_catalog_payload)
+
+
+def get_catalog():
+    return catalog.get()
+
+
+def build_categories_payload():
+    from .models import ProductCategory
+
+    return EncodedPayload.from_data([
+        {'id': category.id, 'name': category.name}
+        for category in ProductCategory.objects.order_by('name', 'id')
+    ])
+
+
+categories = SharedPayload('foodcartapp:categories', build_categories_payload)
@@ -0,0 +1,66 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+CACHE_PREFIX = 'foodcartapp:idempotency:'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+def request_fingerprint(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def _cache_key(key):
+    return CACHE_PREFIX + hashlib.md5(key.encode()).hexdigest()
+
+
+def get_stored_response(key):
+    stored = cache.get(_cache_key(key))
+    if stored is not None:
+        return stored
+    cutoff = timezone.now() - timedelta(seconds=settings.ORDER_IDEMPOTENCY_TTL)
+    record = IdempotencyKey.objects.filter(
+        key=key, created_at__gte=cutoff, status_code__isnull=False,
+    ).only('request_hash', 'status_code', 'response', 'created_at').first()
+    if record is None:
+        return None
+    stored = (record.request_hash, record.status_code, record.response)
+    ttl = settings.ORDER_IDEMPOTENCY_TTL - (timezone.now() - record.created_at).total_seconds()
+    cache.set(_cache_key(key), stored, max(int(ttl), 1))
+    return stored
+
+
+def claim_key(key, request_hash):
+    # Параллельный дубль упирается в уникальный индекс и получает сохранённый ответ
+    cutoff = timezone.now() - timedelta(seconds=settings.ORDER_IDEMPOTENCY_TTL)
+    IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key, request_hash=request_hash)
+    except IntegrityError:
+        raise IdempotencyConflict(key)
+
+
+def store_response(key, request_hash, status_code, data, order=None):
+    data = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+    IdempotencyKey.objects.filter(key=key).update(
+        status_code=status_code,
+        response=data,
+        order=order,
+    )
+    stored = (request_hash, status_code, data)
+    transaction.on_commit(
+        lambda: cache.set(_cache_key(key), stored, settings.ORDER_IDEMPOTENCY_TTL)
+    )
@@ -0,0 +1,61 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+WEBP = 'image/webp'
+# Форматы, которые отдаём как есть; остальное пережимаем в JPEG
+PASSTHROUGH_FORMATS = {
+    'JPEG': ('image/jpeg', '.jpg'),
+    'PNG': ('image/png', '.png'),
+}
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    if image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=settings.PRODUCT_IMAGE_QUALITY, method=4)
+    elif image_format == 'PNG':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.convert('RGB').save(buffer, 'JPEG', quality=settings.PRODUCT_IMAGE_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def build_image_variants(field_file):
+    storage = field_file.storage
+    stem, _ = os.path.splitext(field_file.name)
+    with storage.open(field_file.name, 'rb') as source:
+        image = Image.open(source)
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image_format not in PASSTHROUGH_FORMATS:
+        image_format = 'JPEG'
+    mime_type, extension = PASSTHROUGH_FORMATS[image_format]
+    if image_format == 'PNG' and image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGBA')
+    elif image_format != 'PNG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    widths = [width for width in settings.PRODUCT_IMAGE_WIDTHS if width < image.width] or [image.width]
+    variants = []
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for variant_type, variant_format, variant_extension in (
+            (mime_type, image_format, extension),
+            (WEBP, 'WEBP', '.webp'),
+        ):
+            name = storage.save(
+                f'{stem}-{width}w{variant_extension}',
+                ContentFile(_encode(resized, variant_format)),
+            )
+            variants.append({'width': width, 'type': variant_type, 'name': name})
+    return {'source': field_file.name, 'variants': variants}
+
+
+def delete_image_variants(image_variants, storage):
+    for variant in image_variants.get('variants', []):
+        storage.delete(variant['name'])
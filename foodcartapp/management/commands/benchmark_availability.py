@@ -0,0 +1,78 @@
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.availability import AvailabilityMatrix
+from foodcartapp.models import Restaurant
+
+
+def capable_restaurants_by_sets(restaurant_products, order_products):
+    return [
+        restaurant
+        for restaurant, products in restaurant_products.items()
+        if order_products.issubset(products)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает расчёт доступных ресторанов на множествах и на битовых масках'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--restaurants', type=int, default=200)
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--items', type=int, default=4, help='Позиций в заказе')
+        parser.add_argument('--menu-share', type=float, default=0.9, help='Доля меню в каждом ресторане')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        products = list(range(1, options['products'] + 1))
+        restaurants = [Restaurant(id=index) for index in range(1, options['restaurants'] + 1)]
+        menu = [
+            (restaurant.id, product_id)
+            for restaurant in restaurants
+            for product_id in products
+            if rng.random() < options['menu_share']
+        ]
+        orders = [
+            set(rng.sample(products, options['items']))
+            for _ in range(options['orders'])
+        ]
+
+        started_at = time.perf_counter()
+        restaurant_products = defaultdict(set)
+        restaurants_by_id = {restaurant.id: restaurant for restaurant in restaurants}
+        for restaurant_id, product_id in menu:
+            restaurant_products[restaurants_by_id[restaurant_id]].add(product_id)
+        sets_build_time = time.perf_counter() - started_at
+        started_at = time.perf_counter()
+        by_sets = [capable_restaurants_by_sets(restaurant_products, order) for order in orders]
+        sets_time = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        availability = AvailabilityMatrix(restaurants, menu)
+        masks_build_time = time.perf_counter() - started_at
+        started_at = time.perf_counter()
+        by_masks = [availability.capable_restaurants(order) for order in orders]
+        masks_time = time.perf_counter() - started_at
+
+        matches = all(
+            {restaurant.id for restaurant in left} == {restaurant.id for restaurant in right}
+            for left, right in zip(by_sets, by_masks)
+        )
+        self.stdout.write(
+            f"{options['orders']} заказов × {options['restaurants']} ресторанов × "
+            f"{options['products']} товаров, {len(menu)} позиций меню"
+        )
+        self.stdout.write(
+            f'множества:     построение {sets_build_time * 1000:8.2f} мс, '
+            f'подбор {sets_time * 1000:8.2f} мс'
+        )
+        self.stdout.write(
+            f'битовые маски: построение {masks_build_time * 1000:8.2f} мс, '
+            f'подбор {masks_time * 1000:8.2f} мс  (x{sets_time / masks_time:.1f})'
+        )
+        self.stdout.write(f'результаты совпадают: {"да" if matches else "нет"}')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии и WebP-варианты картинок товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать варианты даже для уже обработанных картинок',
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        products = Product.objects.exclude(image='').order_by('id')
+        for product in products.iterator():
+            if not options['force'] and product.image_variants.get('source') == product.image.name:
+                continue
+            product.update_image_variants(force=True)
+            product.save(update_fields=['image_variants'])
+            processed += 1
+            self.stdout.write(
+                f'{product.name}: вариантов {len(product.image_variants["variants"])}'
+            )
+        self.stdout.write(f'Обработано товаров: {processed} из {products.count()}')
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from coordinates.models import Coordinates
+from coordinates.signals import coordinates_changed
+from foodcartapp.models import Order, Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Привязывает заказы и рестораны к записям координат'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--geocode',
+            action='store_true',
+            help='Геокодировать адреса, для которых ещё нет координат',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перепривязать все записи, а не только непривязанные',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Restaurant, Order):
+            objects = model.objects.exclude(address='').only('id', 'address', 'coordinates')
+            if not options['all']:
+                objects = objects.filter(coordinates__isnull=True)
+            objects = list(objects)
+            addresses = {obj.address for obj in objects}
+            if options['geocode']:
+                Coordinates.objects.batch_get_coordinates(list(addresses))
+
+            coordinates_by_address = Coordinates.objects.for_addresses(addresses)
+            linked = []
+            for obj in objects:
+                coords_obj = coordinates_by_address.get(obj.address)
+                if coords_obj and obj.coordinates_id != coords_obj.id:
+                    obj.coordinates = coords_obj
+                    linked.append(obj)
+            model.objects.bulk_update(linked, ['coordinates'], batch_size=500)
+            if linked:
+                # bulk_update не шлёт post_save, а индекс ресторанов должен узнать о новых привязках
+                coordinates_changed.send(
+                    sender=Coordinates,
+                    ids=list({obj.coordinates_id for obj in linked}),
+                )
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: привязано {len(linked)} из {len(objects)}'
+            )
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coordinates', '0006_coordinates_coordinates_last_ch_e5ad66_idx'),
+        ('foodcartapp', '0044_alter_orderitem_price_alter_product_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='coordinates',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='coordinates.coordinates', verbose_name='координаты'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='coordinates',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='restaurants', to='coordinates.coordinates', verbose_name='координаты'),
+        ),
+    ]
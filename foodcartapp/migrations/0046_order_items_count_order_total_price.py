@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:42
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_totals(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderItem = apps.get_model('foodcartapp', 'OrderItem')
+    items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    Order.objects.update(
+        total_price=Coalesce(
+            Subquery(items.annotate(total=Sum(F('quantity') * F('price'))).values('total')),
+            0,
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+        items_count=Coalesce(Subquery(items.annotate(count=Count('id')).values('count')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0045_order_coordinates_restaurant_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='кол-во позиций'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_price',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='сумма заказа'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:45
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+from foodcartapp.search import build_search_text, create_search_index, drop_search_index
+
+
+def fill_search_text(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderItem = apps.get_model('foodcartapp', 'OrderItem')
+    product_names = defaultdict(list)
+    for order_id, name in OrderItem.objects.values_list('order_id', 'product__name'):
+        product_names[order_id].append(name)
+    orders = list(Order.objects.all())
+    for order in orders:
+        order.search_text = build_search_text(order, product_names[order.id])
+    Order.objects.bulk_update(orders, ['search_text'], batch_size=500)
+    create_search_index(schema_editor)
+
+
+def remove_search_index(apps, schema_editor):
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0046_order_items_count_order_total_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='поисковый текст'),
+        ),
+        migrations.RunPython(fill_search_text, remove_search_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0049_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Banner',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100, verbose_name='заголовок')),
+                ('text', models.CharField(blank=True, max_length=200, verbose_name='текст')),
+                ('image', models.ImageField(upload_to='banners', verbose_name='картинка')),
+                ('order', models.PositiveIntegerField(db_index=True, default=0, verbose_name='порядок')),
+                ('is_active', models.BooleanField(default=True, verbose_name='показывать')),
+                ('active_from', models.DateTimeField(blank=True, null=True, verbose_name='показывать с')),
+                ('active_until', models.DateTimeField(blank=True, null=True, verbose_name='показывать до')),
+            ],
+            options={
+                'verbose_name': 'баннер',
+                'verbose_name_plural': 'баннеры',
+                'ordering': ['order', 'id'],
+                'indexes': [models.Index(fields=['is_active', 'order'], name='foodcartapp_is_acti_b96b5c_idx')],
+            },
+        ),
+    ]
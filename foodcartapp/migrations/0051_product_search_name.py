@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:54
+
+from django.db import migrations, models
+
+from foodcartapp.search import normalize_search_text
+
+TRIGRAM_INDEX = 'foodcartapp_product_search_name_trgm'
+
+
+def fill_search_name(apps, schema_editor):
+    Product = apps.get_model('foodcartapp', 'Product')
+    products = list(Product.objects.only('id', 'name'))
+    for product in products:
+        product.search_name = normalize_search_text(product.name)
+    Product.objects.bulk_update(products, ['search_name'], batch_size=500)
+    # Поиск по подстроке в Postgres обслуживает триграммный индекс
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON foodcartapp_product USING gin (search_name gin_trgm_ops)'
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0050_banner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=50, verbose_name='название для поиска'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'special_status'], name='foodcartapp_categor_921376_idx'),
+        ),
+        migrations.RunPython(fill_search_name, drop_trigram_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:14
+
+from django.db import migrations, models
+
+DEFAULT_BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def create_default_banners(apps, schema_editor):
+    # Стартовые баннеры ссылаются на картинки из статики, чтобы миграция не писала в media
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    if Banner.objects.exists():
+        return
+    Banner.objects.bulk_create([
+        Banner(title=title, text=text, static_image=filename, order=order)
+        for order, (title, filename, text) in enumerate(DEFAULT_BANNERS)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0051_product_search_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banner',
+            name='static_image',
+            field=models.CharField(blank=True, help_text='путь к файлу в статике, если картинка не загружена', max_length=200, verbose_name='картинка из статики'),
+        ),
+        migrations.AlterField(
+            model_name='banner',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='banners', verbose_name='картинка'),
+        ),
+        migrations.RunPython(create_default_banners, migrations.RunPython.noop),
+    ]
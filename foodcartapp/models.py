@@ -1,16 +1,56 @@
-from django.db import models
+from django.db import models, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from phonenumber_field.modelfields import PhoneNumberField
-from django.db.models import Sum, F, Count, Prefetch
+from django.db.models import Sum, F, Count, Min, Prefetch, Q
+from django.templatetags.static import static
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from collections import defaultdict
+import logging
+from coordinates.models import Coordinates
+from coordinates.tasks import enqueue_geocoding
+from .availability import availability_matrix, get_availability_matrix
+from .catalog import catalog
+from .images import build_image_variants, delete_image_variants
+from .search import ORDER_SEARCH_FIELDS, build_search_text, normalize_search_text
+
+logger = logging.getLogger(__name__)
+
+
+def attach_coordinates(instance, update_fields=None):
+    if update_fields is not None and 'address' not in update_fields:
+        return None
+    instance.coordinates = Coordinates.objects.for_address(instance.address)
+    if instance.coordinates and instance.coordinates.is_resolved:
+        return None
+    return instance.address or None
+
+
+def save_with_coordinates(instance, save, *args, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    address_to_geocode = attach_coordinates(instance, update_fields)
+    if update_fields is not None and 'address' in update_fields:
+        kwargs['update_fields'] = {*update_fields, 'coordinates'}
+    save(*args, **kwargs)
+    if address_to_geocode:
+        transaction.on_commit(lambda: enqueue_geocoding(address_to_geocode, instance))
 
 
 class Restaurant(models.Model):
     name = models.CharField('название', max_length=50)
     address = models.CharField('адрес', max_length=100, blank=True)
     contact_phone = models.CharField('контактный телефон', max_length=50, blank=True)
+    coordinates = models.ForeignKey(
+        Coordinates,
+        verbose_name='координаты',
+        related_name='restaurants',
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+    )
 
     class Meta:
         verbose_name = 'ресторан'
@@ -19,15 +59,13 @@ class Restaurant(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        save_with_coordinates(self, super().save, *args, **kwargs)
+
 
 class ProductQuerySet(models.QuerySet):
     def available(self):
-        products = (
-            RestaurantMenuItem.objects
-            .filter(availability=True)
-            .values_list('product')
-        )
-        return self.filter(pk__in=products)
+        return self.filter(pk__in=list(get_availability_matrix().available_product_ids))
 
 
 class ProductCategory(models.Model):
@@ -58,18 +96,102 @@ class Product(models.Model):
         validators=[MinValueValidator(1)]
     )
     image = models.ImageField('картинка')
+    image_variants = models.JSONField('варианты картинки', default=dict, blank=True, editable=False)
     special_status = models.BooleanField('спец.предложение', default=False, db_index=True)
     description = models.TextField('описание', max_length=200, blank=True)
+    search_name = models.CharField('название для поиска', max_length=50, blank=True, db_index=True, editable=False)
 
     objects = ProductQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'товар'
         verbose_name_plural = 'товары'
+        indexes = [
+            models.Index(fields=['category', 'special_status']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        self.search_name = normalize_search_text(self.name)
+        if update_fields is None or {'image', 'image_variants'} & set(update_fields):
+            self.update_image_variants()
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'name' in update_fields:
+                update_fields.add('search_name')
+            if 'image' in update_fields:
+                update_fields.add('image_variants')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+    def update_image_variants(self, force=False):
+        previous_variants = self.image_variants
+        if not self.image:
+            self.image_variants = {}
+            self.discard_image_variants(previous_variants)
+            return
+        if not self.image._committed:
+            # Варианты строим по уже сохранённому в хранилище файлу
+            self.image.save(self.image.name, self.image.file, save=False)
+        if not force and self.image_variants.get('source') == self.image.name:
+            return
+        try:
+            self.image_variants = build_image_variants(self.image)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not build image variants for '{self.image.name}': {e}")
+            self.image_variants = {'source': self.image.name, 'variants': []}
+        self.discard_image_variants(previous_variants)
+
+    def discard_image_variants(self, image_variants):
+        kept = {variant['name'] for variant in self.image_variants.get('variants', [])}
+        stale = {'variants': [
+            variant for variant in image_variants.get('variants', [])
+            if variant['name'] not in kept
+        ]}
+        if stale['variants']:
+            # Файлы удаляем только после коммита, пока на них ещё может ссылаться старая строка
+            storage = self.image.storage
+            transaction.on_commit(lambda: delete_image_variants(stale, storage))
+
+    def get_image_srcset(self):
+        srcset = defaultdict(list)
+        for variant in self.image_variants.get('variants', []):
+            srcset[variant['type']].append(f"{self.image.storage.url(variant['name'])} {variant['width']}w")
+        return {image_type: ', '.join(sources) for image_type, sources in srcset.items()}
+
+    def get_thumbnail_url(self):
+        thumbnails = [
+            variant for variant in self.image_variants.get('variants', [])
+            if variant['type'] != 'image/webp'
+        ]
+        if not thumbnails:
+            return self.image.url
+        thumbnail = min(thumbnails, key=lambda variant: variant['width'])
+        return self.image.storage.url(thumbnail['name'])
+
+
+class RestaurantMenuItemQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        updated = super().update(**kwargs)
+        availability_matrix.invalidate_on_commit()
+        catalog.invalidate_on_commit()
+        return updated
+
+    def bulk_create(self, *args, **kwargs):
+        created = super().bulk_create(*args, **kwargs)
+        availability_matrix.invalidate_on_commit()
+        catalog.invalidate_on_commit()
+        return created
+
+    def bulk_update(self, *args, **kwargs):
+        updated = super().bulk_update(*args, **kwargs)
+        availability_matrix.invalidate_on_commit()
+        catalog.invalidate_on_commit()
+        return updated
+
 
 class RestaurantMenuItem(models.Model):
     restaurant = models.ForeignKey(
@@ -86,6 +208,8 @@ class RestaurantMenuItem(models.Model):
     )
     availability = models.BooleanField('в продаже', default=True, db_index=True)
 
+    objects = RestaurantMenuItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'пункт меню ресторана'
         verbose_name_plural = 'пункты меню ресторана'
@@ -95,41 +219,18 @@ class RestaurantMenuItem(models.Model):
         return f"{self.restaurant.name} - {self.product.name}"
 
 
-class OrderQuerySet(models.QuerySet):
-    def with_total_price(self):
-        return self.annotate(
-            total_price=Sum(F('items__quantity') * F('items__price'))
-        )
-
-    def with_items_count(self):
-        return self.annotate(
-            items_count=Count('items')
-        )
+def attach_available_restaurants(orders):
+    order_products = defaultdict(set)
+    order_items = OrderItem.objects.filter(
+        order_id__in=[order.id for order in orders]
+    ).values_list('order_id', 'product_id')
+    for order_id, product_id in order_items:
+        order_products[order_id].add(product_id)
+    availability = get_availability_matrix()
+    for order in orders:
+        order.available_restaurants = availability.capable_restaurants(order_products[order.id])
+    return orders
 
-    def with_available_restaurants(self):
-        restaurant_menu_items = RestaurantMenuItem.objects.filter(
-            availability=True
-        ).select_related('restaurant', 'product')
-        restaurant_products = defaultdict(set)
-        for menu_item in restaurant_menu_items:
-            restaurant_products[menu_item.restaurant].add(menu_item.product_id)
-        orders_restaurants = {}
-        for order in self:
-            order_product_ids = [item.product_id for item in order.items.all()]
-            order_product_set = set(order_product_ids)
-            if not order_product_ids:
-                orders_restaurants[order.id] = []
-                continue
-            available_restaurants = []
-            for restaurant, products in restaurant_products.items():
-                if order_product_set.issubset(products):
-                    available_restaurants.append(restaurant)
-
-            orders_restaurants[order.id] = available_restaurants
-
-        for order in self:
-            order.available_restaurants = orders_restaurants.get(order.id, [])
-        return self
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -176,8 +277,25 @@ class Order(models.Model):
         blank=True,
         on_delete=models.SET_NULL
     )
-
-    objects = OrderQuerySet.as_manager()
+    coordinates = models.ForeignKey(
+        Coordinates,
+        verbose_name='координаты',
+        related_name='orders',
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+    )
+    total_price = models.DecimalField(
+        'сумма заказа',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        db_index=True,
+        editable=False,
+    )
+    items_count = models.PositiveIntegerField('кол-во позиций', default=0, editable=False)
+    search_text = models.TextField('поисковый текст', blank=True, default='', editable=False)
 
     class Meta:
         verbose_name = 'заказ'
@@ -197,14 +315,34 @@ class Order(models.Model):
     def __str__(self):
         return f"Заказ #{self.id} от {self.firstname} {self.lastname}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding:
+            if not self.search_text:
+                self.search_text = build_search_text(self, [])
+        elif update_fields is None or {*ORDER_SEARCH_FIELDS, 'search_text'} & set(update_fields):
+            self.update_search_text()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_text'}
+        save_with_coordinates(self, super().save, *args, **kwargs)
+
+    def update_search_text(self):
+        product_names = self.items.values_list('product__name', flat=True)
+        self.search_text = build_search_text(self, product_names)
+
     def get_total(self):
-        if hasattr(self, 'total_price'):
-            return self.total_price
-        return self.items.aggregate(
-            total=Sum(F('quantity') * F('price'))
-        )['total'] or 0
+        return self.total_price
     get_total.short_description = 'сумма заказа'
 
+    def update_totals(self):
+        totals = self.items.aggregate(
+            total_price=Sum(F('quantity') * F('price')),
+            items_count=Count('id'),
+        )
+        self.total_price = totals['total_price'] or 0
+        self.items_count = totals['items_count']
+        self.save(update_fields=['total_price', 'items_count', 'search_text'])
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(
@@ -241,4 +379,84 @@ class OrderItem(models.Model):
     def get_cost(self):
         return self.quantity * self.price
     
-    get_cost.short_description = 'стоимость позиции'
\ No newline at end of file
+    get_cost.short_description = 'стоимость позиции'
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField('ключ', max_length=255, unique=True)
+    request_hash = models.CharField('хеш запроса', max_length=64)
+    status_code = models.PositiveSmallIntegerField('код ответа', null=True, blank=True)
+    response = models.JSONField('ответ', null=True, blank=True, encoder=DjangoJSONEncoder)
+    order = models.ForeignKey(
+        Order,
+        verbose_name='заказ',
+        related_name='idempotency_keys',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    created_at = models.DateTimeField('создан', auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'ключ идемпотентности'
+        verbose_name_plural = 'ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
+
+
+class BannerQuerySet(models.QuerySet):
+    def active(self, now=None):
+        now = now or timezone.now()
+        return self.filter(
+            Q(active_from__isnull=True) | Q(active_from__lte=now),
+            Q(active_until__isnull=True) | Q(active_until__gt=now),
+            is_active=True,
+        )
+
+    def next_change(self, now=None):
+        now = now or timezone.now()
+        bounds = self.filter(is_active=True).aggregate(
+            next_start=Min('active_from', filter=Q(active_from__gt=now)),
+            next_end=Min('active_until', filter=Q(active_until__gt=now)),
+        )
+        return min((bound for bound in bounds.values() if bound), default=None)
+
+
+class Banner(models.Model):
+    title = models.CharField('заголовок', max_length=100)
+    text = models.CharField('текст', max_length=200, blank=True)
+    image = models.ImageField('картинка', upload_to='banners', blank=True)
+    static_image = models.CharField(
+        'картинка из статики',
+        max_length=200,
+        blank=True,
+        help_text='путь к файлу в статике, если картинка не загружена',
+    )
+    order = models.PositiveIntegerField('порядок', default=0, db_index=True)
+    is_active = models.BooleanField('показывать', default=True)
+    active_from = models.DateTimeField('показывать с', null=True, blank=True)
+    active_until = models.DateTimeField('показывать до', null=True, blank=True)
+
+    objects = BannerQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['is_active', 'order']),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def clean(self):
+        if not self.image and not self.static_image:
+            raise ValidationError('Загрузите картинку или укажите файл из статики')
+
+    @property
+    def image_url(self):
+        if self.image:
+            return self.image.url
+        return static(self.static_image)
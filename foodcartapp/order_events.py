@@ -0,0 +1,82 @@
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger('foodcartapp.orders')
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        event = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'event': record.getMessage(),
+            **getattr(record, 'payload', {}),
+        }
+        return json.dumps(event, ensure_ascii=False, cls=DjangoJSONEncoder)
+
+
+class ForwardingHandler(logging.Handler):
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+
+    def emit(self, record):
+        logging.getLogger(self.target).handle(record)
+
+
+class DroppingQueueHandler(QueueHandler):
+    # Запись уходит в поток-слушатель, а он передаёт её логгеру target с обработчиками из LOGGING
+    def __init__(self, maxsize=0, target='foodcartapp.order_events'):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target
+        self.dropped = 0
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._listener is None:
+            with self._listener_lock:
+                if self._listener is None:
+                    listener = QueueListener(self.queue, ForwardingHandler(self.target))
+                    listener.start()
+                    self._listener = listener
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        # Переполненная очередь не должна задерживать оформление заказа
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        super().close()
+
+
+def log_order_created(order, items):
+    logger.info('order_created', extra={'payload': {
+        'order_id': order.id,
+        'firstname': order.firstname,
+        'lastname': order.lastname,
+        'phonenumber': str(order.phonenumber),
+        'address': order.address,
+        'status': order.status,
+        'items': [
+            {
+                'product_id': item.product_id,
+                'product': item.product.name,
+                'quantity': item.quantity,
+                'price': item.price,
+            }
+            for item in items
+        ],
+        'total': order.total_price,
+    }})
@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition, require_safe
+
+from .snapshots import VersionedSnapshot
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IDENTITY = 'identity'
+
+
+def encode_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), cls=DjangoJSONEncoder).encode()
+
+
+class EncodedPayload:
+    def __init__(self, body, last_modified=None, expires_at=None):
+        self.expires_at = expires_at
+        self.body = body
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.last_modified = (last_modified or timezone.now()).replace(microsecond=0)
+        self.variants = {
+            IDENTITY: self.body,
+            'gzip': gzip.compress(self.body, mtime=0),
+        }
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(self.body)
+
+    @classmethod
+    def from_data(cls, data, **kwargs):
+        return cls(encode_json(data), **kwargs)
+
+    def choose_encoding(self, request):
+        accepted = set()
+        for coding in request.headers.get('Accept-Encoding', '').split(','):
+            name, *params = coding.split(';')
+            quality = 1.0
+            for param in params:
+                param_name, _, value = param.strip().partition('=')
+                if param_name == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0
+            if quality > 0:
+                accepted.add(name.strip().lower())
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return IDENTITY
+
+    def etag(self, encoding=IDENTITY):
+        # У каждого сжатого варианта свои байты, значит и свой сильный ETag
+        if encoding == IDENTITY:
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+
+class SharedPayload(VersionedSnapshot):
+    def __init__(self, key, build_payload):
+        super().__init__(f'{key}:version', self._load)
+        self.payload_key = f'{key}:payload'
+        self.build_payload = build_payload
+
+    def _load(self):
+        cache_key = f'{self.payload_key}:{self.version()}'
+        payload = cache.get(cache_key)
+        if payload is None:
+            payload = self.build_payload()
+            cache.set(cache_key, payload, settings.PAYLOAD_CACHE_TTL)
+        return payload
+
+    def get(self):
+        payload = super().get()
+        # Содержимое, зависящее от времени, устаревает и без изменений в базе
+        if payload.expires_at and timezone.now() >= payload.expires_at:
+            self.invalidate()
+            payload = super().get()
+        return payload
+
+
+class CompositePayload(SharedPayload):
+    def __init__(self, key, parts):
+        super().__init__(key, self._compose)
+        self.parts = parts
+
+    def version(self):
+        # Версия складывается из версий частей, поэтому своя инвалидация не нужна
+        return ':'.join(str(part.version()) for part in self.parts.values())
+
+    def invalidate(self, **kwargs):
+        # Просроченная часть перестраивается в своём get() и тем самым меняет общую версию
+        for part in self.parts.values():
+            part.get()
+
+    def _compose(self):
+        payloads = {name: part.get() for name, part in self.parts.items()}
+        body = b'{%s}' % b','.join(
+            encode_json(name) + b':' + payload.body for name, payload in payloads.items()
+        )
+        expires = [payload.expires_at for payload in payloads.values() if payload.expires_at]
+        return EncodedPayload(
+            body,
+            last_modified=max(payload.last_modified for payload in payloads.values()),
+            expires_at=min(expires, default=None),
+        )
+
+
+def payload_view(get_payload):
+    def etag(request, *args, **kwargs):
+        payload = get_payload()
+        return payload.etag(payload.choose_encoding(request))
+
+    def last_modified(request, *args, **kwargs):
+        return get_payload().last_modified
+
+    @require_safe
+    @condition(etag_func=etag, last_modified_func=last_modified)
+    def view(request, *args, **kwargs):
+        payload = get_payload()
+        encoding = payload.choose_encoding(request)
+        response = HttpResponse(payload.variants[encoding], content_type='application/json')
+        if encoding != IDENTITY:
+            response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+    return view
@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'foodcartapp_order_search'
+TRIGRAM_INDEX = 'foodcartapp_order_search_trgm'
+ORDER_SEARCH_FIELDS = ('firstname', 'lastname', 'phonenumber', 'address', 'comment')
+# Триграммный токенизатор FTS5 не находит подстроки короче трёх символов
+MIN_TOKEN_LENGTH = 3
+
+
+def normalize_search_text(text):
+    return ' '.join(str(text).lower().replace('ё', 'е').split())
+
+
+def build_search_text(order, product_names):
+    parts = [getattr(order, field) for field in ORDER_SEARCH_FIELDS]
+    parts.extend(product_names)
+    return normalize_search_text(' '.join(str(part) for part in parts if part))
+
+
+def create_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(document, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, document) SELECT id, search_text FROM foodcartapp_order"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON foodcartapp_order USING gin (search_text gin_trgm_ops)'
+        )
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+def index_order(order, created=False):
+    # В Postgres триграммный индекс построен прямо по колонке search_text
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if not created:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [order.pk])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, document) VALUES (%s, %s)',
+            [order.pk, order.search_text],
+        )
+
+
+def unindex_order(order_id):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [order_id])
+
+
+def _fts_query(tokens):
+    return ' AND '.join('"{}"'.format(token.replace('"', '""')) for token in tokens)
+
+
+def search_order_ids(query, statuses=None, limit=None):
+    from .models import Order
+
+    query = normalize_search_text(query)
+    if not query:
+        return []
+    tokens = query.split()
+    if limit is None:
+        limit = settings.ORDER_SEARCH_LIMIT
+    if connection.vendor == 'sqlite' and all(len(token) >= MIN_TOKEN_LENGTH for token in tokens):
+        sql = (
+            f'SELECT {SEARCH_TABLE}.rowid FROM {SEARCH_TABLE}'
+            f' JOIN foodcartapp_order ON foodcartapp_order.id = {SEARCH_TABLE}.rowid'
+            f' WHERE {SEARCH_TABLE} MATCH %s'
+        )
+        params = [_fts_query(tokens)]
+        if statuses:
+            sql += ' AND foodcartapp_order.status IN ({})'.format(', '.join(['%s'] * len(statuses)))
+            params.extend(statuses)
+        sql += f' ORDER BY {SEARCH_TABLE}.rank, foodcartapp_order.created_at DESC LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    orders = Order.objects.all()
+    for token in tokens:
+        orders = orders.filter(search_text__contains=token)
+    if statuses:
+        orders = orders.filter(status__in=statuses)
+    if connection.vendor == 'postgresql':
+        orders = orders.annotate(
+            search_rank=RawSQL('similarity(foodcartapp_order.search_text, %s)', (query,))
+        ).order_by('-search_rank', '-created_at')
+    else:
+        orders = orders.order_by('-created_at')
+    return list(orders.values_list('id', flat=True)[:limit])
@@ -1,11 +1,24 @@
 from rest_framework import serializers
 from phonenumber_field.serializerfields import PhoneNumberField
 from django.core.validators import MinValueValidator
-from .models import Order, OrderItem, Product
+from django.db.models import Exists, OuterRef
+from .models import Order, OrderItem, Product, RestaurantMenuItem
+from .search import build_search_text
+
+
+class ProductIdField(serializers.PrimaryKeyRelatedField):
+    # Продукты загружаются одним запросом в OrderSerializer.validate_products
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = serializers.PrimaryKeyRelatedField(
+    product = ProductIdField(
         queryset=Product.objects.all(),
         error_messages={
             'does_not_exist': 'Продукт с ID "{pk_value}" не существует',
@@ -53,6 +66,24 @@ class OrderSerializer(serializers.ModelSerializer):
     def validate_products(self, value):
         if not value or len(value) == 0:
             raise serializers.ValidationError("Заказ должен содержать хотя бы один товар")
+        products = Product.objects.filter(
+            id__in={item['product'] for item in value}
+        ).annotate(
+            is_available=Exists(RestaurantMenuItem.objects.filter(product=OuterRef('pk'), availability=True))
+        ).in_bulk()
+        product_field = self.fields['products'].child.fields['product']
+        errors = []
+        for item in value:
+            product = products.get(item['product'])
+            if product is None:
+                errors.append({'product': [
+                    product_field.error_messages['does_not_exist'].format(pk_value=item['product'])
+                ]})
+            else:
+                item['product'] = product
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
         return value
 
     def validate(self, data):
@@ -60,7 +91,7 @@ class OrderSerializer(serializers.ModelSerializer):
         for product_data in products_data:
             product = product_data['product']
             quantity = product_data['quantity']
-            if not product.menu_items.filter(availability=True).exists():
+            if not product.is_available:
                 raise serializers.ValidationError(
                     f"Продукт '{product.name}' недоступен для заказа"
                 )
@@ -72,21 +103,27 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         products_data = validated_data.pop('products')
-        order = Order.objects.create(**validated_data)
-        for product_data in products_data:
-            product = product_data['product']
-            quantity = product_data['quantity']
-            OrderItem.objects.create(
+        order = Order(
+            **validated_data,
+            total_price=sum(item['product'].price * item['quantity'] for item in products_data),
+            items_count=len(products_data),
+        )
+        order.search_text = build_search_text(order, [item['product'].name for item in products_data])
+        order.save()
+        order.created_items = OrderItem.objects.bulk_create([
+            OrderItem(
                 order=order,
-                product=product,
-                quantity=quantity,
-                price=product.price
+                product=product_data['product'],
+                quantity=product_data['quantity'],
+                price=product_data['product'].price
             )
+            for product_data in products_data
+        ])
         return order
 
 
 class OrderOutputSerializer(serializers.ModelSerializer):
-    products = OrderItemSerializer(many=True, read_only=True, source='items')
+    products = serializers.SerializerMethodField()
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     total = serializers.DecimalField(source='get_total', max_digits=10, decimal_places=2, read_only=True)
 
@@ -98,3 +135,9 @@ class OrderOutputSerializer(serializers.ModelSerializer):
             'payment_method', 'products', 'total'
         ]
         read_only_fields = fields
+
+    def get_products(self, order):
+        items = getattr(order, 'created_items', None)
+        if items is None:
+            items = order.items.all()
+        return OrderItemSerializer(items, many=True).data
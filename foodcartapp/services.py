@@ -1,13 +1,26 @@
-from coordinates.utils import get_distance_between_addresses
+from django.conf import settings
+
+from coordinates.utils import calculate_distance
 from coordinates.models import Coordinates
+from coordinates.spatial import GridIndex
+from .models import Restaurant
+from .snapshots import VersionedSnapshot
+
+
+def get_position(obj, fallback=None):
+    if obj.coordinates_id and obj.coordinates.is_resolved:
+        return obj.coordinates.position
+    if fallback is not None:
+        return fallback.get(obj.address)
+    return Coordinates.objects.get_or_fetch_coordinates(obj.address)
 
 
 def get_order_coordinates(order):
-    return Coordinates.objects.get_or_fetch_coordinates(order.address)
+    return get_position(order)
 
 
 def get_restaurant_coordinates(restaurant):
-    return Coordinates.objects.get_or_fetch_coordinates(restaurant.address)
+    return get_position(restaurant)
 
 
 def calculate_order_restaurant_distance(order, restaurant):
@@ -15,4 +28,24 @@ def calculate_order_restaurant_distance(order, restaurant):
     restaurant_coords = get_restaurant_coordinates(restaurant)
     if not order_coords or not restaurant_coords:
         return None
-    return get_distance_between_addresses(order.address, restaurant.address)
+    return calculate_distance(order_coords, restaurant_coords)
+
+
+def build_restaurant_index():
+    restaurants = Restaurant.objects.select_related('coordinates').filter(
+        coordinates__lat__isnull=False,
+        coordinates__lon__isnull=False,
+    )
+    return GridIndex(
+        [(restaurant, restaurant.coordinates.position) for restaurant in restaurants],
+        cell_km=settings.RESTAURANT_INDEX_CELL_KM,
+        linear_scan_size=settings.RESTAURANT_INDEX_LINEAR_SCAN_SIZE,
+        method=settings.DISTANCE_METHOD,
+    )
+
+
+restaurant_index = VersionedSnapshot('foodcartapp:restaurant_index_version', build_restaurant_index)
+
+
+def get_restaurant_index():
+    return restaurant_index.get()
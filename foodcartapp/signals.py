@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from coordinates.models import Coordinates
+from coordinates.signals import coordinates_changed
+from .availability import availability_matrix
+from .banners import banners
+from .catalog import catalog, categories
+from .images import delete_image_variants
+from .models import Banner, Order, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .search import index_order, unindex_order
+from .services import restaurant_index
+
+
+def restaurant_positions_changed():
+    # Матрица доступности хранит рестораны вместе с координатами, поэтому сбрасываем и её
+    restaurant_index.invalidate_on_commit()
+    availability_matrix.invalidate_on_commit()
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def restaurant_changed(sender, **kwargs):
+    restaurant_index.invalidate_on_commit()
+
+
+@receiver(post_delete, sender=Coordinates)
+def restaurant_coordinates_deleted(sender, **kwargs):
+    restaurant_positions_changed()
+
+
+@receiver(post_save, sender=Coordinates)
+def restaurant_coordinates_saved(sender, instance, **kwargs):
+    if instance.restaurants.exists():
+        restaurant_positions_changed()
+
+
+@receiver(coordinates_changed)
+def restaurant_coordinates_changed(sender, ids, **kwargs):
+    if Restaurant.objects.filter(coordinates_id__in=ids).exists():
+        restaurant_positions_changed()
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def menu_changed(sender, **kwargs):
+    availability_matrix.invalidate_on_commit()
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def catalog_changed(sender, **kwargs):
+    catalog.invalidate_on_commit()
+
+
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def categories_changed(sender, **kwargs):
+    categories.invalidate_on_commit()
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is None or 'search_text' in update_fields:
+        index_order(instance, created)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    unindex_order(instance.pk)
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def banners_changed(sender, **kwargs):
+    banners.invalidate_on_commit()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    image_variants, storage = instance.image_variants, instance.image.storage
+    transaction.on_commit(lambda: delete_image_variants(image_variants, storage))
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+class VersionedSnapshot:
+    def __init__(self, key, builder):
+        self.key = key
+        self.builder = builder
+        self._snapshot = (None, None)
+        self._version = (None, 0)
+        self._lock = threading.Lock()
+
+    def version(self):
+        version, checked_at = self._version
+        now = time.monotonic()
+        # Общий кэш спрашиваем не чаще раза в интервал, остальные чтения обходятся памятью процесса
+        if version is not None and now - checked_at < settings.SNAPSHOT_VERSION_CHECK_INTERVAL:
+            return version
+        version = cache.get(self.key)
+        if version is None:
+            # после истечения ключа начинаем с заведомо нового номера;
+            # add() выигрывает только один процесс, остальные читают его номер
+            fresh_version = time.time_ns()
+            cache.add(self.key, fresh_version, timeout=settings.SNAPSHOT_VERSION_TTL)
+            version = cache.get(self.key, fresh_version)
+        self._version = (version, now)
+        return version
+
+    def invalidate(self, **kwargs):
+        version = time.time_ns()
+        cache.set(self.key, version, timeout=settings.SNAPSHOT_VERSION_TTL)
+        self._version = (version, time.monotonic())
+
+    def invalidate_on_commit(self):
+        # Сброс внутри транзакции дал бы другим процессам пересобрать снимок по старым данным
+        transaction.on_commit(self.invalidate)
+
+    def get(self):
+        version = self.version()
+        cached_version, value = self._snapshot
+        if cached_version == version:
+            return value
+        with self._lock:
+            cached_version, value = self._snapshot
+            if cached_version != version:
+                value = self.builder()
+                self._snapshot = (version, value)
+        return value
@@ -0,0 +1,271 @@
+import gzip
+import logging
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from coordinates.models import Coordinates
+from coordinates.signals import coordinates_changed
+
+from .availability import availability_matrix
+from .catalog import categories
+from .search import search_order_ids
+from .models import Banner, Order, Product, ProductCategory, Restaurant, RestaurantMenuItem
+
+
+def wait_for_order_events():
+    for handler in logging.getLogger('foodcartapp.orders').handlers:
+        handler.queue.join()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, YANDEX_GEOCODER_API_KEY='')
+class OrderApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        restaurant = Restaurant.objects.create(name='Star Burger', address='Москва, Тверская 1')
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Бургер {number}', price=100 + number, category=category, image='burger.jpg')
+            for number in range(50)
+        ])
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(restaurant=restaurant, product=product)
+            for product in cls.products
+        ])
+
+    def setUp(self):
+        # JSON-записи о заказах не нужны в выводе тестов
+        self.enterContext(mock.patch.object(logging.getLogger('foodcartapp.order_events'), 'handlers', []))
+        self.addCleanup(wait_for_order_events)
+
+    def post_order(self, products, **headers):
+        return self.client.post('/api/order/', {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79161234567',
+            'address': 'Москва, Тверская 2',
+            'products': [{'product': product.id, 'quantity': 2} for product in products],
+        }, content_type='application/json', headers=headers)
+
+
+class RegisterOrderQueriesTest(OrderApiTestCase):
+    # Savepoint и release, продукты с доступностью, координаты, заказ, поисковый индекс, позиции
+    EXPECTED_QUERIES = 7
+
+    def assert_order_saved(self, response, products):
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(id=response.json()['order_id'])
+        self.assertEqual(order.items.count(), len(products))
+        self.assertEqual(order.total_price, sum(product.price * 2 for product in products))
+        self.assertEqual(len(response.json()['order']['products']), len(products))
+
+    def test_single_item_cart(self):
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.post_order(self.products[:1])
+        self.assert_order_saved(response, self.products[:1])
+
+    def test_large_cart(self):
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.post_order(self.products)
+        self.assert_order_saved(response, self.products)
+
+    def test_order_event_is_logged(self):
+        with self.assertLogs('foodcartapp.order_events') as logs:
+            response = self.post_order(self.products[:1])
+            wait_for_order_events()
+        self.assertEqual(logs.records[0].payload['order_id'], response.json()['order_id'])
+
+    def test_unknown_product(self):
+        response = self.post_order([self.products[0], Product(id=10 ** 6)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['errors']['products'][1]['product'],
+            ['Продукт с ID "1000000" не существует'],
+        )
+
+
+class IdempotentOrderTest(OrderApiTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def post_order(self, products):
+        return super().post_order(products, **{'Idempotency-Key': 'checkout-1'})
+
+    def test_replay_returns_stored_response(self):
+        with mock.patch('foodcartapp.models.enqueue_geocoding'), self.captureOnCommitCallbacks(execute=True):
+            response = self.post_order(self.products[:2])
+        self.assertEqual(response.status_code, 201)
+        for clear_cache in (False, True):
+            if clear_cache:
+                cache.clear()
+            with self.assertNumQueries(0 if not clear_cache else 1):
+                replay = self.post_order(self.products[:2])
+            self.assertEqual(replay.status_code, 201)
+            self.assertEqual(replay['Idempotent-Replayed'], 'true')
+            self.assertEqual(replay.json(), response.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_with_other_body(self):
+        self.post_order(self.products[:1])
+        response = self.post_order(self.products[:2])
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_request_does_not_claim_key(self):
+        response = self.post_order([Product(id=10 ** 6)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post_order(self.products[:1]).status_code, 201)
+
+
+class SnapshotInvalidationTest(TestCase):
+    def test_version_changes_only_after_commit(self):
+        version = categories.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductCategory.objects.create(name='Напитки')
+            self.assertEqual(categories.version(), version)
+        self.assertNotEqual(categories.version(), version)
+
+    def test_reads_within_interval_skip_shared_cache(self):
+        categories.get()
+        with mock.patch('foodcartapp.snapshots.cache') as shared_cache:
+            categories.get()
+        shared_cache.get.assert_not_called()
+
+    def test_resolved_restaurant_coordinates_rebuild_availability(self):
+        coords_obj = Coordinates.objects.create(address='Москва, Тверская 1')
+        Restaurant.objects.create(name='Star Burger', address='Москва, Тверская 1', coordinates=coords_obj)
+        version = availability_matrix.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            coordinates_changed.send(sender=Coordinates, ids=[coords_obj.id])
+        self.assertNotEqual(availability_matrix.version(), version)
+
+
+class OrderItemAdminTest(OrderApiTestCase):
+    def test_editing_item_updates_order_totals(self):
+        with mock.patch('foodcartapp.models.enqueue_geocoding'):
+            response = self.post_order(self.products[:2])
+        order = Order.objects.get(id=response.json()['order_id'])
+        item = order.items.get(product=self.products[0])
+        self.client.force_login(get_user_model().objects.create_superuser('admin', password='secret'))
+        response = self.client.post(f'/admin/foodcartapp/orderitem/{item.id}/change/', {
+            'order': order.id,
+            'product': item.product_id,
+            'quantity': 5,
+            'price': item.price,
+        })
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, self.products[0].price * 5 + self.products[1].price * 2)
+        self.client.post(f'/admin/foodcartapp/orderitem/{item.id}/delete/', {'post': 'yes'})
+        order.refresh_from_db()
+        self.assertEqual((order.total_price, order.items_count), (self.products[1].price * 2, 1))
+
+
+class ProductImageVariantsTest(TestCase):
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, PRODUCT_IMAGE_WIDTHS=[160]))
+
+    def make_image(self, name):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(buffer, 'JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def variant_names(self, product):
+        return [variant['name'] for variant in product.image_variants['variants']]
+
+    def test_replaced_and_deleted_images_leave_no_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name='Бургер', price=100, image=self.make_image('first.jpg'))
+        first_variants = self.variant_names(product)
+        self.assertTrue(all(default_storage.exists(name) for name in first_variants))
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image = self.make_image('second.jpg')
+            product.save()
+        self.assertFalse(any(default_storage.exists(name) for name in first_variants))
+        second_variants = self.variant_names(product)
+        self.assertTrue(all(default_storage.exists(name) for name in second_variants))
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertFalse(any(default_storage.exists(name) for name in second_variants))
+
+
+class SearchOrderIdsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with mock.patch('foodcartapp.models.enqueue_geocoding'):
+            cls.orders = [
+                Order.objects.create(
+                    firstname=firstname, lastname=lastname, phonenumber='+79161234567',
+                    address=address, status=order_status,
+                )
+                for firstname, lastname, address, order_status in (
+                    ('Иван', 'Семёнов', 'Москва, Тверская 1', 'new'),
+                    ('Пётр', 'Иванов', 'Москва, Арбат 2', 'new'),
+                    ('Анна', 'Семенова', 'Москва, Тверская 3', 'cooking'),
+                )
+            ]
+
+    def test_matches_all_tokens_and_normalizes_yo(self):
+        first, _, third = self.orders
+        self.assertCountEqual(search_order_ids('семенов тверская'), [first.id, third.id])
+        self.assertEqual(search_order_ids('ИВАН СЕМЁНОВ'), [first.id])
+
+    def test_more_relevant_orders_rank_first(self):
+        with mock.patch('foodcartapp.models.enqueue_geocoding'):
+            relevant = Order.objects.create(
+                firstname='Олег', phonenumber='+79161234567', address='Москва, Арбат 5',
+                comment='арбат, вход с арбата, арбатские ворота',
+            )
+        self.assertEqual(search_order_ids('арбат')[0], relevant.id)
+
+    def test_short_tokens_fall_back_to_contains(self):
+        first, second, third = self.orders
+        self.assertEqual(search_order_ids('ан'), [third.id, second.id, first.id])
+
+    def test_statuses_and_limit(self):
+        first, _, third = self.orders
+        self.assertEqual(search_order_ids('тверская', statuses=['new']), [first.id])
+        self.assertEqual(len(search_order_ids('тверская', limit=1)), 1)
+        self.assertEqual(search_order_ids('   '), [])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PayloadViewTest(TestCase):
+    def get_banners(self, **headers):
+        return self.client.get('/api/banners/', headers=headers)
+
+    def test_each_encoding_has_its_own_etag(self):
+        plain = self.get_banners(**{'Accept-Encoding': 'identity'})
+        compressed = self.get_banners(**{'Accept-Encoding': 'gzip, deflate'})
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(compressed['ETag'], plain['ETag'][:-1] + '-gzip"')
+
+    def test_matching_etag_returns_304_without_queries(self):
+        etag = self.get_banners(**{'Accept-Encoding': 'gzip'})['ETag']
+        with self.assertNumQueries(0):
+            response = self.get_banners(**{'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        # ETag сжатого варианта не подходит к несжатому ответу
+        response = self.get_banners(**{'Accept-Encoding': 'identity', 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_changes_produce_new_etag(self):
+        etag = self.get_banners()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Banner.objects.create(title='Новинка', static_image='burger.jpg')
+        response = self.get_banners(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Новинка', response.content.decode())
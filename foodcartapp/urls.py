@@ -1,6 +1,6 @@
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, RegisterOrderView
+from .views import product_list_api, banners_list_api, bootstrap_api, RegisterOrderView
 
 
 app_name = "foodcartapp"
@@ -8,5 +8,6 @@ app_name = "foodcartapp"
 urlpatterns = [
     path('products/', product_list_api),
     path('banners/', banners_list_api),
+    path('bootstrap/', bootstrap_api),
     path('order/', RegisterOrderView.as_view(), name='register_order')
 ]
@@ -1,105 +1,169 @@
-from django.http import JsonResponse
-from django.templatetags.static import static
+import hashlib
+import logging
+
+from django.conf import settings
 from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import condition, require_safe
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import serializers
-from .models import Product
+from .idempotency import (
+    IdempotencyConflict, MAX_KEY_LENGTH, claim_key, get_stored_response, request_fingerprint, store_response,
+)
+from .banners import get_banners
+from .bootstrap import get_bootstrap
+from .catalog import CATALOG_FIELDS, get_catalog, search_products, serialize_product
+from .order_events import log_order_created
+from .payloads import encode_json, payload_view
 from .serializers import OrderSerializer, OrderOutputSerializer
 
 
-def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+logger = logging.getLogger(__name__)
+
+banners_list_api = payload_view(get_banners)
+
+catalog_api = payload_view(get_catalog)
+
+bootstrap_api = payload_view(get_bootstrap)
+
+PRODUCT_FILTER_PARAMS = {'q', 'category', 'special', 'fields', 'page', 'page_size'}
+BOOLEAN_VALUES = {'1': True, 'true': True, '0': False, 'false': False}
+
+
+def parse_product_filters(params):
+    filters = {'query': params.get('q', ''), 'category_ids': None, 'special': None}
+    errors = {}
+    if params.get('category'):
+        try:
+            filters['category_ids'] = [int(category_id) for category_id in params['category'].split(',')]
+        except ValueError:
+            errors['category'] = 'ID категории должно быть числом'
+    if params.get('special'):
+        filters['special'] = BOOLEAN_VALUES.get(params['special'].lower())
+        if filters['special'] is None:
+            errors['special'] = 'Допустимые значения: true, false, 1, 0'
+    fields = [field.strip() for field in params.get('fields', '').split(',') if field.strip()]
+    unknown_fields = [field for field in fields if field not in CATALOG_FIELDS]
+    if unknown_fields:
+        errors['fields'] = f"Неизвестные поля: {', '.join(unknown_fields)}"
+    try:
+        page = int(params.get('page', 1))
+        page_size = int(params.get('page_size', settings.PRODUCTS_PAGE_SIZE))
+    except ValueError:
+        errors['page'] = 'Номер и размер страницы должны быть числами'
+    else:
+        if page < 1 or not 1 <= page_size <= settings.PRODUCTS_MAX_PAGE_SIZE:
+            errors['page'] = f'Страница начинается с 1, размер страницы — от 1 до {settings.PRODUCTS_MAX_PAGE_SIZE}'
+    if errors:
+        return None, errors
+    return {**filters, 'fields': fields, 'page': page, 'page_size': page_size}, None
+
+
+def get_products_page_url(request, page):
+    query = request.GET.copy()
+    query['page'] = page
+    return f"?{query.urlencode()}"
 
 
+def filtered_products_etag(request, filters):
+    # Выдача целиком определяется версией каталога и параметрами запроса
+    params = hashlib.md5(request.GET.urlencode().encode()).hexdigest()[:16]
+    return f'"{get_catalog().digest}-{params}"'
+
+
+@condition(etag_func=filtered_products_etag)
+def filtered_products_api(request, filters):
+    products = search_products(filters['query'], filters['category_ids'], filters['special'])
+    count = products.count()
+    page, page_size = filters['page'], filters['page_size']
+    results = [serialize_product(product) for product in products[(page - 1) * page_size:page * page_size]]
+    if filters['fields']:
+        results = [{field: product[field] for field in filters['fields']} for product in results]
+    return HttpResponse(encode_json({
+        'count': count,
+        'page': page,
+        'page_size': page_size,
+        'next': get_products_page_url(request, page + 1) if page * page_size < count else None,
+        'previous': get_products_page_url(request, page - 1) if page > 1 else None,
+        'results': results,
+    }), content_type='application/json')
+
+
+@require_safe
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    # Без параметров отдаём прежний список целиком из закешированного каталога
+    if PRODUCT_FILTER_PARAMS.isdisjoint(request.GET):
+        return catalog_api(request)
+    filters, errors = parse_product_filters(request.GET)
+    if errors:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Некорректные параметры запроса',
+            'errors': errors,
+        }, status=400, json_dumps_params={'ensure_ascii': False})
+    return filtered_products_api(request, filters)
 
 
 class RegisterOrderView(APIView):
-    @transaction.atomic
     def post(self, request):
+        idempotency_key = request.headers.get('Idempotency-Key')
+        request_hash = None
+        if idempotency_key:
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                return Response({
+                    'status': 'error',
+                    'message': 'Слишком длинный Idempotency-Key'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            request_hash = request_fingerprint(request.body)
+            replay = self._replay(idempotency_key, request_hash)
+            if replay:
+                return replay
         try:
-            serializer = OrderSerializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
-            order = serializer.save()
+            with transaction.atomic():
+                if idempotency_key:
+                    claim_key(idempotency_key, request_hash)
+                serializer = OrderSerializer(data=request.data)
+                serializer.is_valid(raise_exception=True)
+                order = serializer.save()
+                response_data = {
+                    'status': 'success',
+                    'message': 'Заказ сохранен',
+                    'order_id': order.id,
+                    'order': OrderOutputSerializer(order).data
+                }
+                if idempotency_key:
+                    store_response(idempotency_key, request_hash, status.HTTP_201_CREATED, response_data, order)
+        except IdempotencyConflict:
+            return self._replay(idempotency_key, request_hash) or Response({
+                'status': 'error',
+                'message': 'Запрос с таким Idempotency-Key уже обрабатывается'
+            }, status=status.HTTP_409_CONFLICT)
         except serializers.ValidationError as e:
             return Response({
                 'status': 'error',
                 'message': 'Ошибка валидации данных',
                 'errors': e.detail
             }, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            print(f"Неожиданная ошибка: {type(e).__name__}: {e}")
+        except Exception:
+            logger.exception('Неожиданная ошибка при оформлении заказа')
             return Response({
                 'status': 'error',
                 'message': 'Внутренняя ошибка сервера'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        self._log_order(order)
-
-        output_serializer = OrderOutputSerializer(order)
-        return Response({
-            'status': 'success',
-            'message': 'Заказ сохранен',
-            'order_id': order.id,
-            'order': output_serializer.data
-        }, status=status.HTTP_201_CREATED)
-
-    def _log_order(self, order):
-        print("=" * 50)
-        print(f"СОХРАНЕН ЗАКАЗ #{order.id}")
-        print(f"Имя: {order.firstname}")
-        print(f"Фамилия: {order.lastname}")
-        print(f"Телефон: {order.phonenumber}")
-        print(f"Адрес: {order.address}")
-        print(f"Статус: {order.get_status_display()}")
-        print("Товары:")
-        for item in order.items.all():
-            print(f"  - {item.product.name}: {item.quantity} x {item.price} = {item.quantity * item.price}")
-        print(f"Итого: {order.get_total()}")
-        print("=" * 50)
\ No newline at end of file
+        log_order_created(order, order.created_items)
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+    def _replay(self, idempotency_key, request_hash):
+        stored = get_stored_response(idempotency_key)
+        if stored is None:
+            return None
+        stored_hash, status_code, data = stored
+        if stored_hash != request_hash:
+            return Response({
+                'status': 'error',
+                'message': 'Idempotency-Key уже использован с другим запросом'
+            }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response(data, status=status_code, headers={'Idempotent-Replayed': 'true'})
+
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_cursor(order):
+    return f"{(order.created_at - EPOCH) // MICROSECOND}-{order.id}"
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, order_id = cursor.split('-')
+        return EPOCH + int(timestamp) * MICROSECOND, int(order_id)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, items, newer=None, older=None):
+        self.items = items
+        self.newer = newer
+        self.older = older
+
+
+def paginate_by_created(queryset, size, after=None, before=None):
+    # Курсор — пара (created_at, id), поэтому новые заказы не сдвигают уже открытые страницы
+    after_key = decode_cursor(after) if after else None
+    before_key = decode_cursor(before) if before else None
+    if before_key:
+        created_at, order_id = before_key
+        items = list(queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=order_id)
+        ).order_by('created_at', 'id')[:size + 1])
+        has_newer = len(items) > size
+        items = items[:size][::-1]
+        has_older = bool(items)
+    else:
+        if after_key:
+            created_at, order_id = after_key
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id)
+            )
+        items = list(queryset.order_by('-created_at', '-id')[:size + 1])
+        has_older = len(items) > size
+        items = items[:size]
+        has_newer = bool(after_key)
+    if not items:
+        return KeysetPage(items, newer=after if after_key else None, older=before if before_key else None)
+    return KeysetPage(
+        items,
+        newer=encode_cursor(items[0]) if has_newer else None,
+        older=encode_cursor(items[-1]) if has_older else None,
+    )
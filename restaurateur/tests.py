@@ -1,3 +1,95 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from foodcartapp.models import Order
+
+from .pagination import decode_cursor, encode_cursor, paginate_by_created
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, YANDEX_GEOCODER_API_KEY='', ORDERS_PAGE_SIZE=2)
+class OrderSearchPagesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = get_user_model().objects.create_user('manager', password='secret', is_staff=True)
+        with mock.patch('foodcartapp.models.enqueue_geocoding'):
+            for number in range(5):
+                Order.objects.create(
+                    firstname='Иван',
+                    lastname='Петров',
+                    phonenumber='+79161234567',
+                    address=f'Москва, Тверская {number}',
+                )
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def get_page(self, query):
+        with mock.patch('restaurateur.views.Coordinates.objects.batch_get_coordinates', return_value={}):
+            return self.client.get(f'/manager/orders/{query}')
+
+    def test_every_match_is_reachable(self):
+        seen = []
+        response = self.get_page('?q=петров')
+        while True:
+            seen.extend(item['order'].id for item in response.context['orders_with_restaurants'])
+            older_url = response.context['older_url']
+            if not older_url:
+                break
+            response = self.get_page(older_url)
+        self.assertEqual(sorted(seen), sorted(Order.objects.values_list('id', flat=True)))
+        self.assertIsNotNone(response.context['newer_url'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class GeocodingStatsTest(TestCase):
+    def test_staff_only(self):
+        self.assertEqual(self.client.get('/manager/geocoding-stats/').status_code, 302)
+        self.client.force_login(get_user_model().objects.create_user('manager', is_staff=True))
+        stats = self.client.get('/manager/geocoding-stats/').json()
+        self.assertEqual(set(stats['geocoding_queue']), {'enqueued', 'processed', 'failed', 'dropped', 'pending'})
+        self.assertIn('hit_rate', stats['coordinates_cache'])
+
+
+class PaginateByCreatedTest(TestCase):
+    def create_order(self, minutes_ago):
+        with mock.patch('foodcartapp.models.enqueue_geocoding'):
+            order = Order.objects.create(firstname='Иван', phonenumber='+79161234567', address='Москва')
+        Order.objects.filter(pk=order.pk).update(created_at=self.now - timedelta(minutes=minutes_ago))
+        order.refresh_from_db()
+        return order
+
+    def setUp(self):
+        self.now = timezone.now()
+        # Два заказа с одним временем проверяют, что курсор различает их по id
+        self.orders = [self.create_order(minutes) for minutes in (1, 2, 2, 3, 4)]
+
+    def ids(self, page):
+        return [order.id for order in page.items]
+
+    def test_pages_are_stable_when_new_orders_arrive(self):
+        first = paginate_by_created(Order.objects.all(), 2)
+        self.assertIsNone(first.newer)
+        self.create_order(0)
+        second = paginate_by_created(Order.objects.all(), 2, after=first.older)
+        third = paginate_by_created(Order.objects.all(), 2, after=second.older)
+        seen = self.ids(first) + self.ids(second) + self.ids(third)
+        self.assertEqual(sorted(seen), sorted(order.id for order in self.orders))
+        self.assertIsNone(third.older)
+        back = paginate_by_created(Order.objects.all(), 2, before=second.newer)
+        self.assertEqual(self.ids(back), self.ids(first))
+
+    def test_empty_page_keeps_incoming_cursor(self):
+        last = self.orders[-1]
+        empty = paginate_by_created(Order.objects.all(), 2, after=encode_cursor(last))
+        self.assertEqual(empty.items, [])
+        self.assertEqual(empty.newer, encode_cursor(last))
+        self.assertIsNone(empty.older)
+
+    def test_broken_cursor_is_ignored(self):
+        self.assertIsNone(decode_cursor('garbage'))
+        page = paginate_by_created(Order.objects.all(), 2, after='garbage')
+        self.assertEqual(len(page.items), 2)
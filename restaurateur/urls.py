@@ -15,6 +15,8 @@ urlpatterns = [
     # TODO заглушка для нереализованного функционала
     path('orders/', views.view_orders, name="view_orders"),
 
+    path('geocoding-stats/', views.view_geocoding_stats, name="geocoding_stats"),
+
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
 ]
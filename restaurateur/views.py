@@ -1,16 +1,26 @@
+import os
+
 from django import forms
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.views import View
 from django.urls import reverse_lazy
+from django.utils import timezone
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Q
 
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 
-from foodcartapp.models import Product, Restaurant, Order, RestaurantMenuItem
-from coordinates.utils import calculate_distance
+from foodcartapp.availability import get_availability_matrix
+from foodcartapp.models import Product, Restaurant, Order, attach_available_restaurants
+from foodcartapp.search import search_order_ids
+from coordinates.utils import paired_distances, round_distance
+from coordinates.cache import get_coordinates_cache
 from coordinates.models import Coordinates
+from coordinates.tasks import get_geocoding_queue
+from foodcartapp.services import get_position, get_restaurant_index
+from .pagination import paginate_by_created
 
 class Login(forms.Form):
     username = forms.CharField(
@@ -66,31 +76,15 @@ def is_manager(user):
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
-    restaurants = Restaurant.objects.order_by('name')
-    products = Product.objects.prefetch_related(
-        'menu_items__restaurant'
-    ).select_related('category')
-
-    restaurant_ids = [restaurant.id for restaurant in restaurants]
-    availability_dict = {}
-    menu_items = RestaurantMenuItem.objects.filter(
-        restaurant_id__in=restaurant_ids
-    ).select_related('restaurant', 'product')
-    for item in menu_items:
-        key = (item.product_id, item.restaurant_id)
-        availability_dict[key] = item.availability
-    products_with_restaurant_availability = []
-    for product in products:
-        ordered_availability = [
-            availability_dict.get((product.id, restaurant.id), False)
-            for restaurant in restaurants
-        ]
-        products_with_restaurant_availability.append(
-            (product, ordered_availability)
-        )
+    availability = get_availability_matrix()
+    products = Product.objects.select_related('category')
+    products_with_restaurant_availability = [
+        (product, availability.restaurant_availability(product.id))
+        for product in products
+    ]
     return render(request, template_name="products_list.html", context={
         'products_with_restaurant_availability': products_with_restaurant_availability,
-        'restaurants': restaurants,
+        'restaurants': availability.restaurants,
     })
 
 
@@ -102,60 +96,121 @@ def view_restaurants(request):
     })
 
 
+def get_page_size(request):
+    try:
+        size = int(request.GET.get('size', ''))
+    except ValueError:
+        return settings.ORDERS_PAGE_SIZE
+    return size if size in settings.ORDERS_PAGE_SIZES else settings.ORDERS_PAGE_SIZE
+
+
+def get_page_number(request):
+    try:
+        return max(int(request.GET.get('page', '')), 1)
+    except ValueError:
+        return 1
+
+
+def get_page_url(request, **params):
+    query = request.GET.copy()
+    for key in ('after', 'before', 'page'):
+        query.pop(key, None)
+    query.update(params)
+    return f"?{query.urlencode()}"
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
     status_filter = request.GET.get('status', '')
     search_query = request.GET.get('q', '')
-    orders = Order.objects.with_total_price().select_related(
-        'assigned_restaurant'
+    page_size = get_page_size(request)
+    orders = Order.objects.select_related(
+        'assigned_restaurant__coordinates', 'coordinates'
     ).prefetch_related(
         'items__product'
-    ).order_by('-created_at')
-    
-    if status_filter:
-        orders = orders.filter(status=status_filter)
-    else:
-        orders = orders.filter(status__in=['new', 'processing', 'cooking', 'delivering'])
-        
+    )
+
+    statuses = [status_filter] if status_filter else ['new', 'processing', 'cooking', 'delivering']
+    orders = orders.filter(status__in=statuses)
+
+    newer_url = older_url = None
     if search_query:
-        orders = orders.filter(
-            Q(firstname__icontains=search_query) |
-            Q(lastname__icontains=search_query) |
-            Q(phonenumber__icontains=search_query) |
-            Q(address__icontains=search_query) |
-            Q(comment__icontains=search_query) |
-            Q(items__product__name__icontains=search_query)
-        ).distinct()
-    orders = orders.with_available_restaurants()
-    all_addresses = set()
+        # Результаты поиска ранжированы, поэтому листаем их номером страницы, а не курсором
+        found_ids = search_order_ids(search_query, statuses=statuses)
+        page_number = get_page_number(request)
+        start = (page_number - 1) * page_size
+        page_ids = found_ids[start:start + page_size]
+        search_ranks = {order_id: rank for rank, order_id in enumerate(page_ids)}
+        orders = sorted(orders.filter(id__in=page_ids), key=lambda order: search_ranks[order.id])
+        if page_number > 1:
+            newer_url = get_page_url(request, page=str(page_number - 1))
+        if start + page_size < len(found_ids):
+            older_url = get_page_url(request, page=str(page_number + 1))
+    else:
+        page = paginate_by_created(
+            orders,
+            page_size,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+        orders = page.items
+        if page.newer:
+            newer_url = get_page_url(request, before=page.newer)
+        if page.older:
+            older_url = get_page_url(request, after=page.older)
+    attach_available_restaurants(orders)
+    now = timezone.now()
+    pending_addresses = set()
     for order in orders:
-        all_addresses.add(order.address)
-        
-    all_restaurants = list(Restaurant.objects.all())
-    restaurant_addresses = {restaurant.address for restaurant in all_restaurants if restaurant.address}
-    all_addresses.update(restaurant_addresses)
-    coordinates_cache = Coordinates.objects.batch_get_coordinates(list(all_addresses))
+        for obj in (order, order.assigned_restaurant):
+            if not obj or not obj.address:
+                continue
+            # Привязанную, но неразобранную запись повторяем, когда у неё закончилась пауза
+            if not obj.coordinates_id or (
+                not obj.coordinates.is_resolved and not obj.coordinates.in_backoff(now)
+            ):
+                pending_addresses.add(obj.address)
+    coordinates_cache = Coordinates.objects.batch_get_coordinates(list(pending_addresses))
+
+    order_positions = [get_position(order, coordinates_cache) for order in orders]
+    assigned_orders = [
+        (row, order) for row, order in enumerate(orders)
+        if order.assigned_restaurant and order.assigned_restaurant.address
+    ]
+    assigned_distances = dict(zip(
+        [row for row, _ in assigned_orders],
+        paired_distances(
+            [order_positions[row] for row, _ in assigned_orders],
+            [get_position(order.assigned_restaurant, coordinates_cache) for _, order in assigned_orders],
+            method=settings.DISTANCE_METHOD,
+        ),
+    ))
+    restaurant_index = get_restaurant_index()
     orders_with_restaurants = []
 
-    for order in orders:
+    for row, order in enumerate(orders):
         available_restaurants_with_distance = []
-        assigned_restaurant_distance = None
-        order_coords = coordinates_cache.get(order.address)
-        if order.assigned_restaurant and order.assigned_restaurant.address:
-            restaurant_coords = coordinates_cache.get(order.assigned_restaurant.address)
-            assigned_restaurant_distance = calculate_distance(order_coords, restaurant_coords)
+        order_coords = order_positions[row]
+        assigned_restaurant_distance = round_distance(assigned_distances.get(row))
         if order.status == 'new' and not order.assigned_restaurant and order_coords:
+            capable_ids = {restaurant.id for restaurant in order.available_restaurants}
+            nearest_restaurants = restaurant_index.nearest(
+                *order_coords,
+                k=settings.ORDER_RESTAURANTS_LIMIT,
+                radius_km=settings.ORDER_RESTAURANTS_RADIUS_KM,
+                predicate=lambda restaurant: restaurant.id in capable_ids,
+            )
+            for restaurant, distance in nearest_restaurants:
+                available_restaurants_with_distance.append({
+                    'restaurant': restaurant,
+                    'distance': round_distance(distance)
+                })
             for restaurant in order.available_restaurants:
-                if restaurant.address:
-                    restaurant_coords = coordinates_cache.get(restaurant.address)
-                    distance = calculate_distance(order_coords, restaurant_coords)
+                if not (restaurant.coordinates_id and restaurant.coordinates.is_resolved):
                     available_restaurants_with_distance.append({
                         'restaurant': restaurant,
-                        'distance': distance
+                        'distance': None
                     })
-            available_restaurants_with_distance.sort(
-                key=lambda x: (x['distance'] is None, x['distance'])
-            )
         orders_with_restaurants.append({
             'order': order,
             'available_restaurants': available_restaurants_with_distance,
@@ -165,5 +220,19 @@ def view_orders(request):
         'orders_with_restaurants': orders_with_restaurants,
         'status_filter': status_filter,
         'search_query': search_query,
-        'order_status_choices': Order.STATUS_CHOICES
-    })
\ No newline at end of file
+        'order_status_choices': Order.STATUS_CHOICES,
+        'page_size': page_size,
+        'page_sizes': settings.ORDERS_PAGE_SIZES,
+        'newer_url': newer_url,
+        'older_url': older_url,
+    })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_geocoding_stats(request):
+    # Счётчики живут в памяти процесса, поэтому отдаём и pid обслужившего воркера
+    return JsonResponse({
+        'pid': os.getpid(),
+        'geocoding_queue': get_geocoding_queue().stats(),
+        'coordinates_cache': get_coordinates_cache().stats(),
+    })
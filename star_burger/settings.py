@@ -153,12 +153,94 @@ INTERNAL_IPS = [
 ]
 
 YANDEX_GEOCODER_API_KEY = env('YANDEX_GEOCODER_API_KEY', '')
-
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+GEOCODER_URL = env('GEOCODER_URL', 'https://geocode-maps.yandex.ru/1.x')
+GEOCODER_POOL_SIZE = env.int('GEOCODER_POOL_SIZE', 10)
+GEOCODER_MAX_RETRIES = env.int('GEOCODER_MAX_RETRIES', 2)
+GEOCODER_RETRY_BACKOFF = env.float('GEOCODER_RETRY_BACKOFF', 0.5)
+GEOCODER_BREAKER_THRESHOLD = env.int('GEOCODER_BREAKER_THRESHOLD', 5)
+GEOCODER_BREAKER_RESET_TIMEOUT = env.int('GEOCODER_BREAKER_RESET_TIMEOUT', 30)
+GEOCODER_TIMEOUT = env.float('GEOCODER_TIMEOUT', 5)
+GEOCODER_MAX_WORKERS = env.int('GEOCODER_MAX_WORKERS', 8)
+GEOCODER_RATE_LIMIT = env.float('GEOCODER_RATE_LIMIT', 10)
+GEOCODER_RETRY_BASE = env.int('GEOCODER_RETRY_BASE', 10 * 60)
+GEOCODER_RETRY_MAX = env.int('GEOCODER_RETRY_MAX', 7 * 24 * 60 * 60)
+
+# Redis включается явно через REDIS_URL и делает кэш общим для всех процессов;
+# без него у каждого процесса свой кэш в памяти
+REDIS_URL = env('REDIS_URL', None)
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
+
+COORDINATES_CACHE_ALIAS = env('COORDINATES_CACHE_ALIAS', 'default')
+COORDINATES_CACHE_SIZE = env.int('COORDINATES_CACHE_SIZE', 1024)
+COORDINATES_CACHE_TTL = env.int('COORDINATES_CACHE_TTL', 60 * 60 * 24)
+COORDINATES_CACHE_SYNC_INTERVAL = env.float('COORDINATES_CACHE_SYNC_INTERVAL', 5)
+COORDINATES_TOUCH_FLUSH_INTERVAL = env.int('COORDINATES_TOUCH_FLUSH_INTERVAL', 5 * 60)
+COORDINATES_REFRESH_AGE_DAYS = env.int('COORDINATES_REFRESH_AGE_DAYS', 30)
+GEOCODING_QUEUE_SIZE = env.int('GEOCODING_QUEUE_SIZE', 1000)
+DISTANCE_METHOD = env('DISTANCE_METHOD', 'haversine')
+RESTAURANT_INDEX_CELL_KM = env.float('RESTAURANT_INDEX_CELL_KM', 2)
+RESTAURANT_INDEX_LINEAR_SCAN_SIZE = env.int('RESTAURANT_INDEX_LINEAR_SCAN_SIZE', 200)
+ORDER_RESTAURANTS_LIMIT = env.int('ORDER_RESTAURANTS_LIMIT', 5)
+ORDER_RESTAURANTS_RADIUS_KM = env.float('ORDER_RESTAURANTS_RADIUS_KM', 50)
+ORDER_SEARCH_LIMIT = env.int('ORDER_SEARCH_LIMIT', 500)
+ORDERS_PAGE_SIZE = env.int('ORDERS_PAGE_SIZE', 50)
+ORDERS_PAGE_SIZES = env.list('ORDERS_PAGE_SIZES', [20, 50, 100], subcast=int)
+ORDER_IDEMPOTENCY_TTL = env.int('ORDER_IDEMPOTENCY_TTL', 60 * 60 * 24)
+ORDER_LOG_QUEUE_SIZE = env.int('ORDER_LOG_QUEUE_SIZE', 10000)
+PAYLOAD_CACHE_TTL = env.int('PAYLOAD_CACHE_TTL', 60 * 60 * 24)
+SNAPSHOT_VERSION_TTL = env.int('SNAPSHOT_VERSION_TTL', 60 * 60 * 24)
+SNAPSHOT_VERSION_CHECK_INTERVAL = env.float('SNAPSHOT_VERSION_CHECK_INTERVAL', 5)
+PRODUCT_IMAGE_WIDTHS = env.list('PRODUCT_IMAGE_WIDTHS', [160, 320, 640], subcast=int)
+PRODUCT_IMAGE_QUALITY = env.int('PRODUCT_IMAGE_QUALITY', 80)
+PRODUCTS_PAGE_SIZE = env.int('PRODUCTS_PAGE_SIZE', 24)
+PRODUCTS_MAX_PAGE_SIZE = env.int('PRODUCTS_MAX_PAGE_SIZE', 100)
+
+# События заказов копятся в очереди и пишутся в stdout отдельным потоком, не задерживая ответ
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'foodcartapp.order_events.JsonFormatter',
+        },
+    },
+    'handlers': {
+        'order_queue': {
+            '()': 'foodcartapp.order_events.DroppingQueueHandler',
+            'maxsize': ORDER_LOG_QUEUE_SIZE,
+            'target': 'foodcartapp.order_events',
+        },
+        'order_stdout': {
+            'class': 'logging.StreamHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'foodcartapp.orders': {
+            'handlers': ['order_queue'],
+            'level': env('ORDER_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'foodcartapp.order_events': {
+            'handlers': ['order_stdout'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
 
 STATICFILES_DIRS = [